@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_cache():
+    """Тесты pytest пишут в свой каталог кеша, как и manage.py test."""
+    from core.testing import isolated_cache
+
+    with isolated_cache():
+        yield
@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def clear_cache(sender, **kwargs):
+    """flush и migrate меняют данные в обход сигналов моделей, поэтому
+    после них общий кеш с объектами и фрагментами очищается."""
+    from django.core.cache import cache
+
+    cache.clear()
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import metrics
+
+        connection_created.connect(metrics.track_connection)
+        post_migrate.connect(clear_cache, sender=self)
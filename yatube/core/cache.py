@@ -0,0 +1,778 @@
+import copy
+import hashlib
+import math
+import os
+import pickle
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import \
+    KEY_PREFIX as SESSION_KEY_PREFIX
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connections, transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import identity, metrics
+from .instrumentation import current
+
+STAMP_KEY = 'stamp:{}'
+KEY_SEPARATOR_RE = re.compile(r'[:|]')
+TRACKED_KEYS: int = 10000
+GENERATION_KEY = 'stamp:cache-generation'
+INVALIDATIONS_KEY = 'stamp:cache-invalidations'
+LOCK_KEY = 'lock:{}'
+OBJECT_KEY = 'obj:{}:{}:{}'
+LOCK_POLL_INTERVAL: float = 0.05
+SHARED_ONLY = (STAMP_KEY.format(''), LOCK_KEY.format(''))
+READ_FIELDS = {'hit': 'hits', 'miss': 'misses'}
+_missing = object()
+
+
+def key_prefix(key):
+    """Префикс ключа, по которому группируется статистика кеша.
+
+    Фрагменты шаблонов группируются по имени фрагмента, страницы
+    cache_page и сессии — вместе, остальные ключи — по части до первого «:»
+    (или «|» у ключей sorl-thumbnail).
+    """
+    if key.startswith('template.cache.'):
+        return key.rsplit('.', 1)[0]
+    if key.startswith('views.decorators.cache.'):
+        return 'views.decorators.cache'
+    if key.startswith(SESSION_KEY_PREFIX):
+        return 'session'
+    return KEY_SEPARATOR_RE.split(key, 1)[0]
+
+
+@lru_cache(maxsize=None)
+def database_tag(name, pid):
+    return hashlib.md5(f'{name}:{pid}'.encode()).hexdigest()[:8]
+
+
+def database_key(key, key_prefix, version):
+    """KEY_FUNCTION общего кеша: ключи разных баз не пересекаются.
+
+    Общий кеш переживает процессы, поэтому без этого тестовая база
+    или другая копия проекта на той же машине получили бы объекты
+    и фрагменты, построенные по чужим данным. База в памяти живёт
+    только в своём процессе, и её ключи отделяются ещё и по pid.
+    """
+    connection = connections['default']
+    in_memory = getattr(connection, 'is_in_memory_db', lambda: False)()
+    tag = database_tag(
+        connection.settings_dict['NAME'], os.getpid() if in_memory else None
+    )
+    return f'{key_prefix}:{version}:{tag}:{key}'
+
+
+def get_stamps(*names):
+    """Возвращает метки версий {имя: время последней записи}.
+
+    Отсутствующая метка создаётся со значением «сейчас»: потерянная
+    метка приводит лишь к лишнему промаху кеша, но не к устаревшим данным.
+    """
+    keys = {STAMP_KEY.format(name): name for name in names}
+    found = cache.get_many(keys)
+    stamps = {}
+    for key, name in keys.items():
+        if key not in found:
+            found[key] = time.time()
+            cache.add(key, found[key], None)
+        stamps[name] = found[key]
+    return stamps
+
+
+def bump_stamps(*names):
+    """Сдвигает метки версий, инвалидируя всё, что от них зависит."""
+    now = time.time()
+    cache.set_many({STAMP_KEY.format(name): now for name in names}, None)
+
+
+def stamps_etag(stamps):
+    """Строит ETag по набору меток версий."""
+    raw = ':'.join(repr(stamps[name]) for name in sorted(stamps))
+    return '"{}"'.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def conditional_stamps(request, *names):
+    """Проверяет условный GET по меткам версий.
+
+    Возвращает (etag, last_modified, ответ 304 или None).
+    """
+    stamps = get_stamps(*names)
+    etag = stamps_etag(stamps)
+    last_modified = int(max(stamps.values()))
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    return etag, last_modified, not_modified
+
+
+def stamp_headers(response, etag, last_modified):
+    """Проставляет ответу заголовки, полученные из conditional_stamps."""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def get_or_compute(key, compute, timeout, grace=None):
+    """Значение из кеша или compute(), без лавины пересчётов.
+
+    Запись хранится на grace секунд дольше timeout вместе со сроком
+    свежести и временем вычисления. Пересчитывает её только тот, кто
+    взял блокировку lock:<key>; остальные в это время получают устаревшее
+    значение. Незадолго до истечения запись с растущей вероятностью
+    обновляется заранее (XFetch): чем дольше вычисление, тем раньше.
+    При пустом кеше без блокировки ждём чужой результат не дольше
+    CACHE_LOCK_WAIT секунд, потом считаем сами, не трогая чужую
+    блокировку. Блокировка исключительна, только если add бэкенда
+    атомарен (memcached, redis); у FileBasedCache add — это has_key
+    и set, и два процесса изредка могут взять её одновременно.
+    """
+    if grace is None:
+        grace = settings.CACHE_GRACE_TIME
+    lock_key = LOCK_KEY.format(key)
+    entry = cache.get(key)
+    acquired = False
+    if entry is not None:
+        value, fresh_until, delta = entry
+        early = delta * settings.CACHE_EARLY_REFRESH_BETA * -math.log(
+            1 - random.random()
+        )
+        if time.time() + early < fresh_until:
+            return value
+        acquired = cache.add(lock_key, True, settings.CACHE_LOCK_TIMEOUT)
+        if not acquired:
+            return value
+    else:
+        acquired = cache.add(lock_key, True, settings.CACHE_LOCK_TIMEOUT)
+        if not acquired:
+            deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry[0]
+    try:
+        start = time.time()
+        value = compute()
+        delta = time.time() - start
+        cache.set(key, (value, time.time() + timeout, delta), timeout + grace)
+    finally:
+        if acquired:
+            cache.delete(lock_key)
+    return value
+
+
+class ObjectCache:
+    """Read-through кеш экземпляров модели по pk и естественным ключам.
+
+    Повторяет нужную часть API QuerySet: get(pk=...) или get(<ключ>=...)
+    и in_bulk(), поэтому экземпляр можно передать в get_object_or_404.
+    Под ключом pk хранится объект без связанных, по естественному ключу —
+    только pk; совпадение ключа у найденного объекта проверяется, так что
+    после переименования старый указатель просто даёт промах. Связанные
+    объекты из related берутся из их собственных ObjectCache, поэтому
+    изменение автора не требует сбрасывать его посты. Запись удаляется
+    обработчиком invalidate на post_save и post_delete. Если задан fields,
+    в кеш попадают только эти поля и pk, остальные остаются отложенными
+    и при обращении догружаются из базы. Внутри транзакции
+    объекты кладутся в кеш только после её фиксации: строка, прочитанная
+    в откатившейся транзакции, не должна пережить откат. Внутри запроса
+    объекты берутся сначала из карты идентичности (core.identity), так
+    что один объект загружается за запрос один раз и в одном экземпляре.
+    """
+
+    registry = {}
+
+    def __init__(self, model, natural_keys=(), related=(), fields=None):
+        self.model = model
+        self.natural_keys = natural_keys
+        self.related = related
+        self.fields = fields
+        self.label = model._meta.label_lower
+        ObjectCache.registry[model] = self
+
+    def key(self, field, value):
+        return OBJECT_KEY.format(self.label, field, value)
+
+    def queryset(self):
+        return self.model._default_manager.select_related(*self.related)
+
+    def get(self, **kwargs):
+        if len(kwargs) != 1:
+            raise TypeError('ObjectCache.get принимает один ключ.')
+        (field, value), = kwargs.items()
+        if field in ('pk', self.model._meta.pk.name):
+            field = 'pk'
+        elif field not in self.natural_keys:
+            return self.remember(self.queryset().get(**kwargs))
+        obj = identity.get(self.model, field, value)
+        if obj is not None:
+            return obj
+        pk = value if field == 'pk' else cache.get(self.key(field, value))
+        if pk is not None:
+            found = self.cached({pk})
+            obj = found.get(pk)
+            if obj is not None and (
+                field == 'pk' or getattr(obj, field) == value
+            ):
+                return obj
+        obj = self.remember(self.queryset().get(**{field: value}))
+        self.store([obj])
+        return obj
+
+    def in_bulk(self, pks):
+        """Словарь {pk: объект} для найденных pk; промахи — одним запросом."""
+        pks = set(pks)
+        found = self.cached(pks)
+        missing = pks - set(found)
+        if missing:
+            loaded = {
+                pk: self.remember(obj)
+                for pk, obj in self.queryset().in_bulk(missing).items()
+            }
+            self.store(loaded.values())
+            found.update(loaded)
+        return found
+
+    def cached(self, pks):
+        """Объекты из карты запроса или из кеша со связанными; неполные
+        считаются промахом."""
+        known = {}
+        for pk in pks:
+            obj = identity.get(self.model, 'pk', pk)
+            if obj is not None:
+                known[pk] = obj
+        keys = {self.key('pk', pk): pk for pk in pks if pk not in known}
+        found = {
+            keys[key]: obj for key, obj in cache.get_many(keys).items()
+        } if keys else {}
+        for name in self.related:
+            field = self.model._meta.get_field(name)
+            related_ids = {
+                getattr(obj, field.attname) for obj in found.values()
+            } - {None}
+            related = ObjectCache.registry[field.related_model].cached(
+                related_ids
+            )
+            for pk, obj in list(found.items()):
+                related_id = getattr(obj, field.attname)
+                if related_id is None:
+                    continue
+                if related_id not in related:
+                    del found[pk]
+                else:
+                    setattr(obj, name, related[related_id])
+        for pk, obj in found.items():
+            known[pk] = identity.add(obj, self.natural_keys)
+        return known
+
+    def remember(self, obj):
+        """Кладёт объект и его связанные из related в карту запроса и
+        возвращает экземпляр из неё."""
+        self.remember_related(obj)
+        return identity.add(obj, self.natural_keys)
+
+    def remember_related(self, obj):
+        """Заменяет загруженные связанные из related экземплярами из
+        карты запроса."""
+        for name in self.related:
+            field = self.model._meta.get_field(name)
+            related = field.get_cached_value(obj, None)
+            if related is not None:
+                field.set_cached_value(
+                    obj, ObjectCache.registry[type(related)].remember(related)
+                )
+
+    def entries(self, obj):
+        clone = copy.copy(obj)
+        clone._state = copy.copy(obj._state)
+        clone._state.fields_cache = {}
+        clone.__dict__.pop('_prefetched_objects_cache', None)
+        if self.fields is not None:
+            opts = self.model._meta
+            kept = {opts.pk.attname} | {
+                opts.get_field(name).attname for name in self.fields
+            }
+            for field in opts.concrete_fields:
+                if field.attname not in kept:
+                    clone.__dict__.pop(field.attname, None)
+        entries = {self.key('pk', obj.pk): clone}
+        for field in self.natural_keys:
+            entries[self.key(field, getattr(obj, field))] = obj.pk
+        for name in self.related:
+            field = self.model._meta.get_field(name)
+            related = field.get_cached_value(obj, None)
+            if related is not None:
+                entries.update(
+                    ObjectCache.registry[type(related)].entries(related)
+                )
+        return entries
+
+    def store(self, objects):
+        entries = {}
+        for obj in objects:
+            entries.update(self.entries(obj))
+        if entries:
+            transaction.on_commit(
+                lambda: cache.set_many(entries, settings.OBJECT_CACHE_TIME)
+            )
+
+    def invalidate(self, sender, instance, **kwargs):
+        """Обработчик post_save и post_delete: удаляет запись сразу и ещё
+        раз после фиксации, чтобы параллельный запрос не вернул в кеш
+        старую строку."""
+        key = self.key('pk', instance.pk)
+        identity.forget(instance)
+        cache.delete(key)
+        transaction.on_commit(lambda: cache.delete(key))
+
+
+def remember(obj):
+    """Кладёт объект в карту запроса через его ObjectCache, если он есть."""
+    objects = ObjectCache.registry.get(type(obj))
+    if objects is None:
+        return identity.add(obj)
+    return objects.remember(obj)
+
+
+def remember_related(obj):
+    """Связанные объекты obj — экземплярами из карты запроса; сам obj
+    не заменяется, чтобы не потерять проставленные на нём атрибуты."""
+    objects = ObjectCache.registry.get(type(obj))
+    if objects is not None:
+        objects.remember_related(obj)
+
+
+class InstrumentedCache(BaseCache):
+    """Обёртка над кешем из OPTIONS['TARGET'], измеряющая обращения к нему.
+
+    По префиксам ключей (key_prefix) считает попадания, промахи, записи,
+    вытеснения, размеры значений и время обращений; данные попадают
+    в /metrics, в лог yatube.timing и в stats(). Вытеснением считается
+    промах по ключу, записанному этим процессом и ещё не истёкшему.
+
+    Ключи передаются целевому кешу как есть: префиксы, версии и таймауты
+    по умолчанию задаются в его настройках.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._target = caches[params['OPTIONS']['TARGET']]
+        self._deadlines = {}
+
+    def _call(self, method, *args, **kwargs):
+        stats = current()
+        start = time.perf_counter()
+        try:
+            return getattr(self._target, method)(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if stats is not None:
+                stats.cache_time += elapsed
+                stats.cache_calls += 1
+            if args and isinstance(args[0], str):
+                prefix = key_prefix(args[0])
+            else:
+                prefix = 'many'
+            metrics.observe(
+                'yatube_cache_seconds', elapsed, prefix=prefix, op=method
+            )
+
+    def _read(self, key, hit):
+        prefix = key_prefix(key)
+        result = 'hit' if hit else 'miss'
+        metrics.inc(
+            'yatube_cache_requests_total', prefix=prefix, result=result
+        )
+        stats = current()
+        if stats is not None:
+            stats.cache_results[(prefix, result)] += 1
+        if hit:
+            return
+        deadline = self._deadlines.pop(key, _missing)
+        if deadline is not _missing and (
+            deadline is None or deadline > time.time()
+        ):
+            metrics.inc('yatube_cache_evictions_total', prefix=prefix)
+
+    def _written(self, key, value, timeout):
+        prefix = key_prefix(key)
+        metrics.inc('yatube_cache_sets_total', prefix=prefix)
+        try:
+            size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            size = None
+        if size is not None:
+            metrics.observe('yatube_cache_value_bytes', size, prefix=prefix)
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self._target.default_timeout
+        if timeout is not None and timeout <= 0:
+            self._deadlines.pop(key, None)
+            return
+        if len(self._deadlines) >= TRACKED_KEYS:
+            try:
+                self._deadlines.pop(next(iter(self._deadlines)), None)
+            except (RuntimeError, StopIteration):
+                pass
+        self._deadlines[key] = (
+            None if timeout is None else time.time() + timeout
+        )
+
+    def stats(self):
+        """Накопленная процессом статистика по префиксам ключей."""
+        series = {
+            'yatube_cache_requests_total': None,
+            'yatube_cache_sets_total': 'sets',
+            'yatube_cache_evictions_total': 'evictions',
+            'yatube_cache_value_bytes_sum': 'bytes',
+            'yatube_cache_seconds_sum': 'seconds',
+        }
+        result = {}
+        for (name, labels), value in metrics.process_values().items():
+            if name not in series:
+                continue
+            labels = dict(labels)
+            field = series[name] or READ_FIELDS[labels['result']]
+            entry = result.setdefault(labels['prefix'], {
+                'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0,
+                'bytes': 0, 'seconds': 0.0,
+            })
+            entry[field] += value
+        return result
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._call('add', key, value, timeout, version)
+        if added:
+            self._written(key, value, timeout)
+        return added
+
+    def get(self, key, default=None, version=None):
+        value = self._call('get', key, _missing, version)
+        self._read(key, value is not _missing)
+        return default if value is _missing else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._call('set', key, value, timeout, version)
+        self._written(key, value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('touch', key, timeout, version)
+
+    def delete(self, key, version=None):
+        self._deadlines.pop(key, None)
+        return self._call('delete', key, version)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self._call('get_many', keys, version)
+        for key in keys:
+            self._read(key, key in found)
+        return found
+
+    def has_key(self, key, version=None):
+        return self._call('has_key', key, version)
+
+    def incr(self, key, delta=1, version=None):
+        return self._call('incr', key, delta, version)
+
+    def decr(self, key, delta=1, version=None):
+        return self._call('decr', key, delta, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._call('set_many', data, timeout, version)
+        for key, value in data.items():
+            if key not in failed:
+                self._written(key, value, timeout)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self._deadlines.pop(key, None)
+        return self._call('delete_many', keys, version)
+
+    def clear(self):
+        self._deadlines.clear()
+        return self._call('clear')
+
+    def close(self, **kwargs):
+        return self._target.close(**kwargs)
+
+
+class SharedFileCache(FileBasedCache):
+    """FileBasedCache для общего уровня TieredCache.
+
+    В Django 2.2 каждый set() перечисляет весь каталог в _cull(), а при
+    переполнении удаляет случайные файлы, в том числе бессрочные метки
+    версий, поколение и журнал удалений. Здесь каталог проверяется не чаще
+    раза в OPTIONS['CULL_INTERVAL'] секунд на процесс, сначала удаляются
+    просроченные записи, а бессрочные не удаляются никогда.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        options = params.get('OPTIONS', {})
+        self._cull_interval = options.get('CULL_INTERVAL', 60)
+        self._culled_at = None
+
+    def _expiry(self, fname):
+        """Срок записи из заголовка файла: None для бессрочной."""
+        try:
+            with open(fname, 'rb') as file:
+                return pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return 0
+
+    def _cull(self):
+        now = time.monotonic()
+        if (self._culled_at is not None
+                and now - self._culled_at < self._cull_interval):
+            return
+        self._culled_at = now
+        filelist = self._list_cache_files()
+        if len(filelist) < self._max_entries:
+            return
+        deadline = time.time()
+        permanent = 0
+        temporary = []
+        for fname in filelist:
+            expiry = self._expiry(fname)
+            if expiry is None:
+                permanent += 1
+            elif expiry < deadline:
+                self._delete(fname)
+            else:
+                temporary.append(fname)
+        if permanent + len(temporary) < self._max_entries:
+            return
+        if self._cull_frequency:
+            temporary = random.sample(temporary, min(
+                len(temporary), len(filelist) // self._cull_frequency
+            ))
+        for fname in temporary:
+            self._delete(fname)
+
+
+class TieredCache(BaseCache):
+    """Двухуровневый кеш: LRU в памяти процесса (L1) перед общим кешем
+    из OPTIONS['SHARED'] (L2).
+
+    Метки версий, блокировки и другие ключи с префиксами из
+    OPTIONS['SHARED_ONLY'] читаются только из L2, поэтому всё, что
+    строится по меткам, одинаково свежо во всех воркерах. Прочие ключи живут
+    в L1 не дольше L1_TIMEOUT секунд. delete дописывает ключ в журнал
+    удалений в L2, и остальные процессы, проверяя журнал не чаще раза
+    в CHECK_INTERVAL секунд, убирают из L1 только эти ключи. Журнал хранит
+    последние INVALIDATION_LOG записей; процесс, отставший сильнее,
+    сбрасывает L1 целиком, как и после clear, который сдвигает поколение.
+    Дописывание в журнал — чтение и запись без блокировки: запись,
+    потерянная в гонке, оставляет старое значение в L1 не дольше
+    L1_TIMEOUT. Значения в L1 хранятся сериализованными, как
+    в LocMemCache, чтобы вызывающий код не мог их изменить.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared = caches[options['SHARED']]
+        self._max_entries = options.get('MAX_ENTRIES', 1000)
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._check_interval = options.get('CHECK_INTERVAL', 1)
+        self._shared_only = tuple(options.get('SHARED_ONLY', SHARED_ONLY))
+        self._log_size = options.get('INVALIDATION_LOG', 1000)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._seen = None
+        self._checked_at = 0.0
+
+    def _check_generation(self):
+        now = time.monotonic()
+        if now - self._checked_at < self._check_interval:
+            return
+        self._checked_at = now
+        shared = self._shared.get_many([GENERATION_KEY, INVALIDATIONS_KEY])
+        generation = shared.get(GENERATION_KEY)
+        if generation is None:
+            generation = time.time()
+            if not self._shared.add(GENERATION_KEY, generation, None):
+                generation = self._shared.get(GENERATION_KEY, generation)
+        log = shared.get(INVALIDATIONS_KEY) or []
+        latest = log[-1][0] if log else 0
+        if generation != self._generation:
+            with self._lock:
+                self._local.clear()
+            self._generation = generation
+        elif self._seen is not None and latest != self._seen:
+            with self._lock:
+                if not log or log[0][0] > self._seen + 1:
+                    self._local.clear()
+                else:
+                    for seq, key in log:
+                        if seq > self._seen:
+                            self._local.pop(key, None)
+        self._seen = latest
+
+    def _invalidate(self, keys, version=None):
+        """Дописывает ключи в журнал удалений для остальных процессов."""
+        keys = [
+            self.make_key(key, version) for key in keys
+            if not key.startswith(self._shared_only)
+        ]
+        if not keys:
+            return
+        log = self._shared.get(INVALIDATIONS_KEY) or []
+        seq = log[-1][0] if log else 0
+        log = log + [(seq + i, key) for i, key in enumerate(keys, 1)]
+        self._shared.set(INVALIDATIONS_KEY, log[-self._log_size:], None)
+
+    def _bump_generation(self):
+        self._generation = time.time()
+        self._checked_at = time.monotonic()
+        self._shared.set(GENERATION_KEY, self._generation, None)
+
+    def _local_get(self, key, version=None):
+        key = self.make_key(key, version)
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return _missing
+            pickled, deadline = entry
+            if deadline <= time.monotonic():
+                del self._local[key]
+                return _missing
+            self._local.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _local_set(self, key, value, timeout, version=None):
+        if key.startswith(self._shared_only):
+            return
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self._shared.default_timeout
+        lifetime = self._l1_timeout
+        if timeout is not None:
+            if timeout <= 0:
+                self._local_delete(key, version)
+                return
+            lifetime = min(lifetime, timeout)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        key = self.make_key(key, version)
+        with self._lock:
+            self._local[key] = (pickled, time.monotonic() + lifetime)
+            self._local.move_to_end(key)
+            while len(self._local) > self._max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key, version=None):
+        key = self.make_key(key, version)
+        with self._lock:
+            self._local.pop(key, None)
+
+    def _tier(self, result):
+        metrics.inc('yatube_cache_tier_total', tier=result)
+
+    def get(self, key, default=None, version=None):
+        if not key.startswith(self._shared_only):
+            self._check_generation()
+            value = self._local_get(key, version)
+            if value is not _missing:
+                self._tier('l1')
+                return value
+        value = self._shared.get(key, _missing, version)
+        if value is _missing:
+            self._tier('miss')
+            return default
+        self._tier('l2')
+        self._local_set(key, value, self._l1_timeout, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._check_generation()
+        found = {}
+        remote = []
+        for key in keys:
+            value = _missing
+            if not key.startswith(self._shared_only):
+                value = self._local_get(key, version)
+            if value is _missing:
+                remote.append(key)
+            else:
+                self._tier('l1')
+                found[key] = value
+        if remote:
+            shared = self._shared.get_many(remote, version)
+            for key in remote:
+                if key in shared:
+                    self._tier('l2')
+                    self._local_set(
+                        key, shared[key], self._l1_timeout, version
+                    )
+                else:
+                    self._tier('miss')
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._shared.set(key, value, timeout, version)
+        self._local_set(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._shared.add(key, value, timeout, version)
+        if added:
+            self._local_set(key, value, timeout, version)
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._shared.set_many(data, timeout, version)
+        for key, value in data.items():
+            if key not in failed:
+                self._local_set(key, value, timeout, version)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._shared.touch(key, timeout, version)
+
+    def has_key(self, key, version=None):
+        if self._local_get(key, version) is not _missing:
+            return True
+        return self._shared.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local_delete(key, version)
+        return self._shared.incr(key, delta, version)
+
+    def decr(self, key, delta=1, version=None):
+        self._local_delete(key, version)
+        return self._shared.decr(key, delta, version)
+
+    def delete(self, key, version=None):
+        result = self._shared.delete(key, version)
+        self._local_delete(key, version)
+        self._invalidate([key], version)
+        return result
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self._local_delete(key, version)
+        self._shared.delete_many(keys, version)
+        self._invalidate(keys, version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self._shared.clear()
+        self._bump_generation()
+
+    def close(self, **kwargs):
+        self._shared.close(**kwargs)
@@ -0,0 +1,66 @@
+"""Карта идентичности запроса.
+
+Внутри scope() каждый объект модели хранится в одном экземпляре под
+ключами (модель, 'pk', pk) и (модель, поле, значение) для естественных
+ключей. Повторная загрузка того же объекта за запрос возвращает уже
+известный экземпляр. Вне scope() функции ничего не делают, поэтому
+команды и тесты без запроса работают как прежде.
+"""
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+def current():
+    """Карта текущего запроса или None вне запроса."""
+    return getattr(_local, 'objects', None)
+
+
+@contextmanager
+def scope():
+    previous = current()
+    _local.objects = {}
+    try:
+        yield _local.objects
+    finally:
+        _local.objects = previous
+
+
+def model_of(obj):
+    return obj._meta.concrete_model
+
+
+def get(model, field, value):
+    """Объект из карты или None."""
+    objects = current()
+    if objects is None:
+        return None
+    return objects.get((model, field, value))
+
+
+def add(obj, natural_keys=()):
+    """Кладёт объект в карту и возвращает экземпляр из неё: если объект
+    с тем же pk уже загружен за запрос, возвращается он."""
+    objects = current()
+    if objects is None or obj.pk is None:
+        return obj
+    model = model_of(obj)
+    obj = objects.setdefault((model, 'pk', obj.pk), obj)
+    for field in natural_keys:
+        objects[(model, field, getattr(obj, field))] = obj
+    return obj
+
+
+def forget(obj):
+    """Убирает из карты объект с pk obj под всеми ключами, например после
+    его записи."""
+    objects = current()
+    if objects is None:
+        return
+    model = model_of(obj)
+    for key in [
+        key for key, known in objects.items()
+        if key[0] is model and known.pk == obj.pk
+    ]:
+        del objects[key]
@@ -0,0 +1,97 @@
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+_local = threading.local()
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Нормализует SQL: литералы и списки IN заменяются плейсхолдерами."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+class RequestStats:
+    """Счётчики времени одного запроса: база, шаблоны и кеш."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_time = 0.0
+        self.cache_calls = 0
+        self.cache_results = Counter()
+        self.statements = Counter()
+        self.fingerprints = Counter()
+        self.depth = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[(sql, str(params))] += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        """Сколько раз запросы повторялись с теми же параметрами."""
+        return sum(
+            count - 1 for count in self.statements.values() if count > 1
+        )
+
+    def repeated(self, threshold):
+        """Шаблоны запросов, выполненные не меньше threshold раз (N+1)."""
+        return {
+            sql: count
+            for sql, count in self.fingerprints.items()
+            if count >= threshold
+        }
+
+
+def current():
+    """Счётчики текущего запроса или None, если запрос не измеряется."""
+    return getattr(_local, 'stats', None)
+
+
+@contextmanager
+def collect(stats):
+    previous = current()
+    _local.stats = stats
+    try:
+        yield stats
+    finally:
+        _local.stats = previous
+
+
+@contextmanager
+def timed(attr):
+    """Добавляет время блока к атрибуту счётчиков текущего запроса.
+
+    Вложенные блоки с тем же атрибутом (include внутри render) не
+    считаются: время учитывает только внешний.
+    """
+    stats = current()
+    if stats is None:
+        yield
+        return
+    stats.depth[attr] += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.depth[attr] -= 1
+        if not stats.depth[attr]:
+            elapsed = time.perf_counter() - start
+            setattr(stats, attr, getattr(stats, attr) + elapsed)
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет истёкшие сессии пачками по первичному ключу, чтобы '
+        'не держать долгую блокировку таблицы django_session. '
+        'Запускается по расписанию, например раз в сутки из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.SESSION_CLEANUP_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Пауза между пачками в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now)
+        deleted = batches = 0
+        while True:
+            keys = list(expired.values_list('pk', flat=True)[
+                :options['batch_size']
+            ])
+            if not keys:
+                break
+            deleted += Session.objects.filter(pk__in=keys).delete()[0]
+            batches += 1
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(
+            f'Удалено сессий: {deleted}, пачек: {batches}'
+        )
@@ -0,0 +1,75 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Выполняется в новом интерпретаторе: импорт приложения и первый запрос.
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+from yatube.wsgi import application
+loaded = time.perf_counter()
+from core.management.commands.loadtest import call
+_, elapsed, status = call(
+    application, ('cold', 'GET', sys.argv[1], '', '', '', None)
+)
+print(json.dumps({
+    'import': loaded - start, 'first_request': elapsed, 'status': status,
+}))
+'''
+PHASES = ('total', 'import', 'first_request')
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет холодный старт: от запуска процесса до первого ответа 200, '
+        'с прогревом yatube.wsgi и без него.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--path', default='/')
+
+    def handle(self, *args, **options):
+        report = {
+            mode: self.measure(warmup, options)
+            for mode, warmup in (('warmup', '1'), ('no_warmup', '0'))
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def measure(self, warmup, options):
+        env = dict(os.environ, YATUBE_WARMUP=warmup)
+        samples = {phase: [] for phase in PHASES}
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-c', CHILD, options['path']],
+                cwd=settings.BASE_DIR, env=env,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            )
+            total = time.perf_counter() - start
+            if result.returncode:
+                raise CommandError(result.stderr.decode())
+            child = json.loads(result.stdout.decode().splitlines()[-1])
+            if child['status'] != 200:
+                raise CommandError(
+                    'Первый ответ {}: {}'.format(
+                        child['status'], options['path']
+                    )
+                )
+            child['total'] = total
+            for phase in PHASES:
+                samples[phase].append(child[phase])
+        return {
+            phase: {
+                'median_ms': round(statistics.median(values) * 1000, 1),
+                'min_ms': round(min(values) * 1000, 1),
+                'max_ms': round(max(values) * 1000, 1),
+            }
+            for phase, values in samples.items()
+        }
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.warmup import compile_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Компилирует все шаблоны проекта и завершается с ошибкой, '
+        'если какой-то из них не компилируется. Шаг сборки перед выкладкой.'
+    )
+
+    def handle(self, *args, **options):
+        count, errors = compile_templates()
+        for name, error in errors:
+            self.stderr.write(f'{name}: {error}')
+        if errors:
+            raise CommandError(
+                f'Не скомпилировано шаблонов: {len(errors)} из '
+                f'{count + len(errors)}'
+            )
+        self.stdout.write(f'Скомпилировано шаблонов: {count}')
@@ -0,0 +1,263 @@
+import io
+import json
+import random
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from importlib import import_module
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.core.management.base import BaseCommand, CommandError
+from django.middleware.csrf import _get_new_csrf_token
+from django.urls import reverse
+
+from posts.models import Post, User
+
+# Сценарий: (вес в смеси, нужна ли авторизация).
+SCENARIOS = {
+    'feed': (40, False),
+    'deep_page': (10, False),
+    'post_detail': (25, False),
+    'follow_index': (10, True),
+    'comment': (10, True),
+    'follow': (5, True),
+}
+PERCENTILES = (50, 95, 99)
+SESSION_USERS: int = 20
+FEED_PAGES: int = 3
+
+
+def percentile(ordered, percent):
+    """Перцентиль по методу ближайшего ранга для отсортированного списка."""
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def call(application, task):
+    """Выполняет запрос через WSGI-приложение и меряет его время."""
+    scenario, method, path, query, cookie, csrf_token, body = task
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'HTTP_HOST': 'localhost',
+        'HTTP_COOKIE': cookie,
+    }
+    if body is not None:
+        data = body.encode()
+        environ.update({
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(data)),
+            'HTTP_X_CSRFTOKEN': csrf_token,
+            'wsgi.input': io.BytesIO(data),
+        })
+    setup_testing_defaults(environ)
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split()[0]))
+
+    start = time.perf_counter()
+    result = application(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return scenario, time.perf_counter() - start, status[0]
+
+
+def run_in_process(tasks):
+    """Точка входа дочернего процесса: свой экземпляр приложения."""
+    from yatube.wsgi import application
+
+    return [call(application, task) for task in tasks]
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет взвешенную смесь запросов через yatube.wsgi.application '
+        'и выводит пропускную способность и перцентили задержек в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--warmup', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--mode', choices=('thread', 'process'), default='thread'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', help='Файл для отчёта в JSON, иначе stdout.'
+        )
+        parser.add_argument(
+            '--baseline', help='Отчёт другой ревизии для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.prepare()
+        warmup = [self.task() for _ in range(options['warmup'])]
+        tasks = [self.task() for _ in range(options['requests'])]
+        self.run(warmup, options)
+        started = time.perf_counter()
+        results = self.run(tasks, options)
+        duration = time.perf_counter() - started
+        report = self.report(results, duration, options)
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                self.compare(json.load(file), report)
+
+    def prepare(self):
+        self.post_ids = list(Post.objects.values_list('pk', flat=True))
+        if not self.post_ids:
+            raise CommandError(
+                'В базе нет постов: заполните её командой seed_scale.'
+            )
+        self.pages = max(1, -(-len(self.post_ids) // settings.COUNT))
+        self.usernames = list(User.objects.order_by('pk').values_list(
+            'username', flat=True
+        )[:1000])
+        # Выборка из отсортированных pk через self.rng: с тем же --seed
+        # прогон получает тех же пользователей, в отличие от ORDER BY
+        # RANDOM() в базе.
+        user_ids = sorted(User.objects.values_list('pk', flat=True))
+        user_ids = self.rng.sample(
+            user_ids, min(SESSION_USERS, len(user_ids))
+        )
+        users = User.objects.in_bulk(user_ids)
+        SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+        self.sessions = []
+        for user in map(users.get, user_ids):
+            session = SessionStore()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.create()
+            csrf_token = _get_new_csrf_token()
+            cookie = '{}={}; {}={}'.format(
+                settings.SESSION_COOKIE_NAME, session.session_key,
+                settings.CSRF_COOKIE_NAME, csrf_token,
+            )
+            self.sessions.append((cookie, csrf_token))
+
+    def task(self):
+        """Случайный запрос из смеси SCENARIOS."""
+        names = list(SCENARIOS)
+        scenario = self.rng.choices(
+            names, weights=[SCENARIOS[name][0] for name in names]
+        )[0]
+        cookie, csrf_token = '', ''
+        if SCENARIOS[scenario][1]:
+            cookie, csrf_token = self.rng.choice(self.sessions)
+        method, query, body = 'GET', '', None
+        post_id = self.rng.choice(self.post_ids)
+        if scenario == 'feed':
+            path = reverse('posts:index')
+            query = urlencode({'page': self.rng.randint(1, FEED_PAGES)})
+        elif scenario == 'deep_page':
+            path = reverse('posts:index')
+            query = urlencode({'page': self.rng.randint(1, self.pages)})
+        elif scenario == 'post_detail':
+            path = reverse('posts:post_detail', args=(post_id,))
+        elif scenario == 'follow_index':
+            path = reverse('posts:follow_index')
+        elif scenario == 'comment':
+            method = 'POST'
+            path = reverse('posts:add_comment', args=(post_id,))
+            body = urlencode({'text': 'Комментарий нагрузочного теста'})
+        else:
+            path = reverse(
+                'posts:profile_follow',
+                args=(self.rng.choice(self.usernames),)
+            )
+        return scenario, method, path, query, cookie, csrf_token, body
+
+    def run(self, tasks, options):
+        workers = options['concurrency']
+        if options['mode'] == 'process':
+            chunks = [tasks[i::workers] for i in range(workers)]
+            with ProcessPoolExecutor(workers) as executor:
+                return [
+                    result
+                    for chunk in executor.map(run_in_process, chunks)
+                    for result in chunk
+                ]
+        from yatube.wsgi import application
+
+        with ThreadPoolExecutor(workers) as executor:
+            return list(executor.map(
+                lambda task: call(application, task), tasks
+            ))
+
+    def report(self, results, duration, options):
+        by_scenario = {}
+        for scenario, elapsed, status in results:
+            by_scenario.setdefault(scenario, []).append((elapsed, status))
+        by_scenario['all'] = [
+            (elapsed, status) for _, elapsed, status in results
+        ]
+        latency = {}
+        for scenario, samples in sorted(by_scenario.items()):
+            ordered = sorted(elapsed * 1000 for elapsed, _ in samples)
+            latency[scenario] = {
+                'count': len(ordered),
+                'errors': sum(status >= 400 for _, status in samples),
+                'mean': round(sum(ordered) / len(ordered), 3),
+                'max': round(ordered[-1], 3),
+                **{
+                    f'p{percent}': round(percentile(ordered, percent), 3)
+                    for percent in PERCENTILES
+                },
+            }
+        return {
+            'revision': self.revision(),
+            'mode': options['mode'],
+            'concurrency': options['concurrency'],
+            'requests': len(results),
+            'duration_s': round(duration, 3),
+            'throughput_rps': round(len(results) / duration, 2),
+            'latency_ms': latency,
+        }
+
+    def revision(self):
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL,
+            ).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def compare(self, baseline, report):
+        """Печатает изменение метрик относительно отчёта baseline."""
+        def change(old, new):
+            return '{:+.1f}%'.format((new - old) / old * 100) if old else '-'
+
+        self.stderr.write('Сравнение с {}:'.format(baseline.get('revision')))
+        self.stderr.write('  throughput_rps: {} -> {} ({})'.format(
+            baseline['throughput_rps'], report['throughput_rps'],
+            change(baseline['throughput_rps'], report['throughput_rps']),
+        ))
+        for scenario, stats in report['latency_ms'].items():
+            old = baseline['latency_ms'].get(scenario)
+            if not old:
+                continue
+            self.stderr.write('  {}: {}'.format(scenario, ', '.join(
+                '{} {}'.format(key, change(old[key], stats[key]))
+                for key in (f'p{percent}' for percent in PERCENTILES)
+            )))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core import memory
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет index, profile и follow_index под tracemalloc и выводит '
+        'места выделений, оставшихся после запроса, и рост памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        follow = Follow.objects.select_related('user', 'author').first()
+        if follow is None:
+            raise CommandError(
+                'В базе нет подписок: заполните её командой seed_scale.'
+            )
+        paths = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(follow.author.username,)),
+            reverse('posts:follow_index'),
+        )
+        with override_settings(
+            MEMORY_PROFILING=True,
+            SLOW_QUERY_THRESHOLD_MS=0,
+        ):
+            client = Client()
+            client.force_login(follow.user)
+            for path in paths:
+                client.get(path)
+            memory.reset()
+            for _ in range(options['requests']):
+                for path in paths:
+                    client.get(path)
+        self.stdout.write(memory.report(options['limit']))
@@ -0,0 +1,85 @@
+import copy
+import json
+import re
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+TEMPLATE_TIMING_RE = re.compile(r'tpl;dur=([\d.]+)')
+
+
+def templates_setting(cached):
+    """TEMPLATES проекта с кеширующим загрузчиком или без него."""
+    templates = copy.deepcopy(settings.TEMPLATES)
+    templates[0]['APP_DIRS'] = False
+    templates[0]['OPTIONS']['loaders'] = (
+        [('django.template.loaders.cached.Loader', LOADERS)] if cached
+        else LOADERS
+    )
+    return templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет время рендера шаблонов на страницах index, group_list, '
+        'profile и post_detail с кеширующим загрузчиком и без него.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+
+    def handle(self, *args, **options):
+        post = Post.objects.select_related('author', 'group').filter(
+            group__isnull=False
+        ).first()
+        if post is None:
+            raise CommandError(
+                'В базе нет постов в группах: заполните её командой '
+                'seed_scale.'
+            )
+        paths = {
+            'index': reverse('posts:index'),
+            'group_list': reverse('posts:group_list', args=(post.group.slug,)),
+            'profile': reverse('posts:profile', args=(post.author.username,)),
+            'post_detail': reverse('posts:post_detail', args=(post.pk,)),
+        }
+        report = {
+            mode: self.measure(cached, paths, options['requests'])
+            for mode, cached in (('uncached', False), ('cached', True))
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def measure(self, cached, paths, requests):
+        with override_settings(
+            TEMPLATES=templates_setting(cached),
+            SLOW_QUERY_THRESHOLD_MS=0,
+            SERVER_TIMING_SAMPLE_RATE=1.0,
+            SERVER_TIMING_HEADER=True,
+        ):
+            client = Client()
+            for path in paths.values():
+                client.get(path)
+            report = {}
+            for name, path in paths.items():
+                samples = []
+                for _ in range(requests):
+                    response = client.get(path)
+                    samples.append(float(TEMPLATE_TIMING_RE.search(
+                        response['Server-Timing']
+                    ).group(1)))
+                report[name] = {
+                    'median_ms': round(statistics.median(samples), 2),
+                    'renders_per_second': round(
+                        len(samples) * 1000 / sum(samples), 1
+                    ),
+                }
+            return report
@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.models import Follow
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_TABLE = 'django_session'
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает запросы к базе на авторизованный запрос follow_index, '
+        'post_create и post_detail с разными хранилищами сессий.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20)
+
+    def handle(self, *args, **options):
+        follow = Follow.objects.select_related('user', 'author').first()
+        if follow is None:
+            raise CommandError(
+                'В базе нет подписок: заполните её командой seed_scale.'
+            )
+        post = follow.author.posts.first()
+        paths = [reverse('posts:follow_index'), reverse('posts:post_create')]
+        if post is not None:
+            paths.append(reverse('posts:post_detail', args=(post.pk,)))
+        report = {
+            name: self.measure(engine, follow.user, paths, options)
+            for name, engine in ENGINES.items()
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def measure(self, engine, user, paths, options):
+        with override_settings(
+            SESSION_ENGINE=engine,
+            SLOW_QUERY_THRESHOLD_MS=0,
+        ):
+            client = Client()
+            client.force_login(user)
+            for path in paths:
+                client.get(path)
+            queries = []
+
+            def wrapper(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(wrapper):
+                for _ in range(options['requests']):
+                    for path in paths:
+                        client.get(path)
+        requests = options['requests'] * len(paths)
+        return {
+            'queries_per_request': round(len(queries) / requests, 2),
+            'session_queries_per_request': round(
+                sum(SESSION_TABLE in sql for sql in queries) / requests, 2
+            ),
+        }
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from core.models import SlowQuery
+
+ORDERINGS = {
+    'total': '-total_time',
+    'count': '-count',
+    'max': '-max_time',
+}
+
+
+class Command(BaseCommand):
+    help = 'Показывает статистику медленных запросов по отпечаткам SQL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--order', choices=ORDERINGS, default='total',
+            help='Сортировка: суммарное время, количество или максимум.'
+        )
+        parser.add_argument(
+            '--plans', action='store_true', help='Печатать планы запросов.'
+        )
+        parser.add_argument(
+            '--reset', action='store_true', help='Очистить статистику.'
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(f'Удалено записей: {deleted}')
+            return
+        queries = SlowQuery.objects.order_by(
+            ORDERINGS[options['order']]
+        )[:options['limit']]
+        for query in queries:
+            self.stdout.write(
+                '{:>8} раз  всего {:>10.1f} мс  макс {:>8.1f} мс  '
+                'среднее {:>8.1f} мс  {}'.format(
+                    query.count, query.total_time, query.max_time,
+                    query.total_time / query.count, query.view,
+                )
+            )
+            self.stdout.write(f'    {query.fingerprint}')
+            if options['plans'] and query.plan:
+                for line in query.plan.splitlines():
+                    self.stdout.write(f'      {line}')
@@ -0,0 +1,94 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+from django.urls import reverse
+
+from core.management.commands.loadtest import call
+from posts.models import GroupStats, User
+
+
+# Запросы анонимные: фрагмент index и карточки постов общие для всех
+# читателей, а ссылки подписки подставляются в них на каждый запрос,
+# поэтому прогретый кеш достаётся и авторизованным пользователям.
+# Фрагменты index живут CACHE_TIME плюс CACHE_GRACE_TIME секунд, так что
+# команду запускают сразу перед переключением трафика.
+class Command(BaseCommand):
+    help = (
+        'Прогревает общий кеш после выкладки: первые страницы index, '
+        'крупнейшие группы и самые читаемые профили.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=settings.CACHE_WARMUP_PAGES,
+            help='Сколько первых страниц index прогреть.',
+        )
+        parser.add_argument(
+            '--groups', type=int, default=settings.CACHE_WARMUP_GROUPS,
+            help='Сколько групп с наибольшим числом постов прогреть.',
+        )
+        parser.add_argument(
+            '--profiles', type=int, default=settings.CACHE_WARMUP_PROFILES,
+            help='Сколько профилей с наибольшим числом подписчиков прогреть.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=settings.CACHE_WARMUP_CONCURRENCY,
+            help='Сколько запросов выполняется одновременно.',
+        )
+
+    def handle(self, *args, **options):
+        tasks = self.tasks(options)
+        from yatube.wsgi import application
+
+        def warm(task):
+            try:
+                return call(application, task)
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            results = list(executor.map(warm, tasks))
+        duration = time.perf_counter() - started
+        report = {'total_ms': round(duration * 1000, 1), 'kinds': {}}
+        for (kind, *_), (_, elapsed, status) in zip(tasks, results):
+            summary = report['kinds'].setdefault(
+                kind, {'pages': 0, 'errors': 0, 'ms': 0.0}
+            )
+            summary['pages'] += 1
+            summary['errors'] += status != 200
+            summary['ms'] = round(summary['ms'] + elapsed * 1000, 1)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def tasks(self, options):
+        """Запросы в формате loadtest.call: (вид, метод, путь, query...)."""
+        paths = [
+            ('index', reverse('posts:index'), {'page': page})
+            for page in range(1, options['pages'] + 1)
+        ]
+        groups = GroupStats.objects.select_related('group').order_by(
+            '-post_count'
+        )[:options['groups']]
+        paths.extend(
+            ('group', reverse('posts:group_list', args=(stats.group.slug,)),
+             {})
+            for stats in groups
+        )
+        authors = User.objects.annotate(
+            followers=Count('following')
+        ).filter(followers__gt=0).order_by('-followers')[:options['profiles']]
+        paths.extend(
+            ('profile', reverse('posts:profile', args=(author.username,)), {})
+            for author in authors
+        )
+        return [
+            (kind, 'GET', path, urlencode(query), '', '', None)
+            for kind, path, query in paths
+        ]
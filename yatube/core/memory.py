@@ -0,0 +1,83 @@
+import threading
+import tracemalloc
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+IGNORED = (
+    __file__,
+    tracemalloc.__file__,
+    '<frozen importlib._bootstrap>',
+    '<frozen importlib._bootstrap_external>',
+    '<unknown>',
+)
+FILTERS = [tracemalloc.Filter(False, pattern) for pattern in IGNORED]
+
+_lock = threading.Lock()
+_sizes = defaultdict(Counter)
+_counts = defaultdict(Counter)
+_requests = Counter()
+_baseline = None
+
+
+def start(frames):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def snapshot():
+    return tracemalloc.take_snapshot().filter_traces(FILTERS)
+
+
+def site(traceback):
+    """Место выделения и ближайший к нему кадр кода проекта."""
+    frames = list(traceback)
+    newest = frames[-1]
+    where = f'{newest.filename}:{newest.lineno}'
+    for frame in reversed(frames[:-1]):
+        if frame.filename.startswith(settings.BASE_DIR):
+            return f'{where} <- {frame.filename}:{frame.lineno}'
+    return where
+
+
+def record(view, before, after):
+    """Добавляет к статистике view память, оставшуюся после запроса."""
+    diff = after.compare_to(before, 'traceback')
+    with _lock:
+        _requests[view] += 1
+        for stat in diff:
+            if stat.size_diff:
+                _sizes[view][site(stat.traceback)] += stat.size_diff
+                _counts[view][site(stat.traceback)] += stat.count_diff
+
+
+def reset():
+    global _baseline
+    with _lock:
+        _sizes.clear()
+        _counts.clear()
+        _requests.clear()
+        _baseline = snapshot() if tracemalloc.is_tracing() else None
+
+
+def report(limit):
+    """Текстовый отчёт: места выделений по view и рост с момента reset."""
+    lines = []
+    with _lock:
+        views = sorted(_requests.items())
+        top = {view: _sizes[view].most_common(limit) for view, _ in views}
+        counts = {view: dict(_counts[view]) for view, _ in views}
+    for view, requests in views:
+        lines.append(f'{view}: запросов {requests}, в среднем на запрос:')
+        for where, size in top[view]:
+            lines.append('  {:>+12.1f} KiB {:>+8.1f} блоков  {}'.format(
+                size / requests / 1024, counts[view][where] / requests, where
+            ))
+    if _baseline is not None:
+        lines.append(f'Рост с момента сброса, топ-{limit}:')
+        for stat in snapshot().compare_to(_baseline, 'lineno')[:limit]:
+            lines.append(f'  {stat}')
+    if not lines:
+        lines.append('Данных нет: профилирование памяти выключено '
+                     'или запросов ещё не было.')
+    return '\n'.join(lines) + '\n'
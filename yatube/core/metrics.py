@@ -0,0 +1,292 @@
+"""Счётчики для /metrics в текстовом формате Prometheus.
+
+Каждый поток пишет в свой словарь без блокировок, процесс суммирует
+словари потоков и раз в METRICS_FLUSH_INTERVAL сбрасывает итог в
+METRICS_DIR/<pid>.json. Эндпоинт складывает файлы всех процессов;
+счётчики завершившихся процессов сливаются в METRICS_DIR/merged.json.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import weakref
+from collections import defaultdict
+from contextlib import suppress
+
+from django.conf import settings
+from django.core.files import locks
+
+MERGED_FILE = 'merged.json'
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+CACHE_LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05,
+)
+SIZE_BUCKETS = (
+    64, 256, 1024, 4096, 16384, 65536, 262144, 1048576,
+)
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Обработанные запросы.'
+    ),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время обработки запроса.'
+    ),
+    'yatube_db_queries_total': (
+        'counter', 'Запросы к базе данных.'
+    ),
+    'yatube_cache_requests_total': (
+        'counter', 'Чтения кеша по префиксам ключей: попадания и промахи.'
+    ),
+    'yatube_cache_tier_total': (
+        'counter', 'Чтения двухуровневого кеша: из L1, из L2 и промахи.'
+    ),
+    'yatube_cache_sets_total': (
+        'counter', 'Записи в кеш по префиксам ключей.'
+    ),
+    'yatube_cache_evictions_total': (
+        'counter', 'Промахи по ключам, вытесненным до истечения таймаута.'
+    ),
+    'yatube_cache_value_bytes': (
+        'histogram', 'Размер записываемых в кеш значений.'
+    ),
+    'yatube_cache_seconds': (
+        'histogram', 'Время обращений к кешу.'
+    ),
+    'yatube_thumbnail_seconds': (
+        'histogram', 'Время создания миниатюр.'
+    ),
+    'yatube_db_connections': (
+        'gauge', 'Открытые соединения с базой данных.'
+    ),
+}
+BUCKETS = {
+    'yatube_cache_value_bytes': SIZE_BUCKETS,
+    'yatube_cache_seconds': CACHE_LATENCY_BUCKETS,
+}
+
+_local = threading.local()
+_shards = []
+_connections = weakref.WeakSet()
+_last_flush = 0.0
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = defaultdict(float)
+        _shards.append(shard)
+    return shard
+
+
+def labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    _shard()[(name, labels_key(labels))] += value
+
+
+def observe(name, value, **labels):
+    """Добавляет значение в гистограмму name."""
+    shard = _shard()
+    key = labels_key(labels)
+    for bound in BUCKETS.get(name, LATENCY_BUCKETS):
+        if value <= bound:
+            shard[(f'{name}_bucket', key + (('le', str(bound)),))] += 1
+            break
+    shard[(f'{name}_sum', key)] += value
+    shard[(f'{name}_count', key)] += 1
+
+
+def track_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: учитывает соединение в gauge."""
+    _connections.add(connection)
+
+
+def process_values():
+    """Сумма счётчиков всех потоков процесса."""
+    values = defaultdict(float)
+    for shard in list(_shards):
+        for key, value in dict(shard).items():
+            values[key] += value
+    return values
+
+
+def process_gauges():
+    return {
+        ('yatube_db_connections', ()): sum(
+            1 for wrapper in list(_connections)
+            if wrapper.connection is not None
+        ),
+    }
+
+
+def path_for(pid):
+    return os.path.join(settings.METRICS_DIR, f'{pid}.json')
+
+
+def write(path, data):
+    """Атомарно заменяет файл: читатель видит старый или новый JSON."""
+    fd, tmp_path = tempfile.mkstemp(dir=settings.METRICS_DIR)
+    with os.fdopen(fd, 'w') as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+
+def read(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def flush(force=False):
+    """Сбрасывает значения процесса в файл не чаще интервала."""
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    write(path_for(os.getpid()), {
+        'counters': [
+            [name, labels, value]
+            for (name, labels), value in process_values().items()
+        ],
+        'gauges': [
+            [name, labels, value]
+            for (name, labels), value in process_gauges().items()
+        ],
+    })
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_pids():
+    try:
+        names = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        return []
+    return [
+        int(pid) for pid, ext in map(os.path.splitext, names)
+        if ext == '.json' and pid.isdigit()
+    ]
+
+
+def merge_dead(pids):
+    """Переносит счётчики завершившихся процессов в MERGED_FILE и
+    удаляет их файлы: каталог не растёт с каждым перезапуском
+    воркеров, а счётчики не убывают."""
+    if not pids:
+        return
+    merged_path = os.path.join(settings.METRICS_DIR, MERGED_FILE)
+    with open(os.path.join(settings.METRICS_DIR, '.lock'), 'a') as lock:
+        locks.lock(lock, locks.LOCK_EX)
+        try:
+            merged = read(merged_path) or {'counters': []}
+            values = defaultdict(float)
+            for name, labels, value in merged['counters']:
+                values[(name, json.dumps(labels))] += value
+            paths = [path_for(pid) for pid in pids]
+            for data in filter(None, map(read, paths)):
+                for name, labels, value in data['counters']:
+                    values[(name, json.dumps(labels))] += value
+            write(merged_path, {'counters': [
+                [name, json.loads(labels), value]
+                for (name, labels), value in values.items()
+            ]})
+            for path in paths:
+                with suppress(FileNotFoundError):
+                    os.remove(path)
+        finally:
+            locks.unlock(lock)
+
+
+def collect():
+    """Значения всех процессов: счётчики суммируются всегда, gauge —
+    только у живых процессов."""
+    flush(force=True)
+    alive, dead = [], []
+    for pid in process_pids():
+        (alive if is_alive(pid) else dead).append(pid)
+    merge_dead(dead)
+    values = defaultdict(float)
+    paths = [path_for(pid) for pid in alive]
+    paths.append(os.path.join(settings.METRICS_DIR, MERGED_FILE))
+    for data in filter(None, map(read, paths)):
+        for name, labels, value in data['counters'] + data.get('gauges', []):
+            values[(name, tuple(tuple(pair) for pair in labels))] += value
+    return values
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(
+        '{}="{}"'.format(
+            key,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for key, value in labels
+    )
+
+
+def format_value(value):
+    """Значение без потери точности: счётчики растут за пределы шести
+    значащих цифр формата :g."""
+    return repr(float(value))
+
+
+def render(values):
+    """Текстовый формат Prometheus 0.0.4."""
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        if kind != 'histogram':
+            for (name, labels), value in sorted(values.items()):
+                if name == metric:
+                    lines.append(
+                        f'{metric}{format_labels(labels)} '
+                        f'{format_value(value)}'
+                    )
+            continue
+        counts = {
+            labels: value for (name, labels), value in values.items()
+            if name == f'{metric}_count'
+        }
+        for labels, count in sorted(counts.items()):
+            cumulative = 0
+            for bound in BUCKETS.get(metric, LATENCY_BUCKETS):
+                cumulative += values.get((
+                    f'{metric}_bucket', labels + (('le', str(bound)),)
+                ), 0)
+                lines.append('{}_bucket{} {}'.format(
+                    metric,
+                    format_labels(labels + (('le', str(bound)),)),
+                    format_value(cumulative),
+                ))
+            lines.append('{}_bucket{} {}'.format(
+                metric, format_labels(labels + (('le', '+Inf'),)),
+                format_value(count),
+            ))
+            lines.append('{}_sum{} {}'.format(
+                metric, format_labels(labels),
+                format_value(values[(f'{metric}_sum', labels)]),
+            ))
+            lines.append(
+                f'{metric}_count{format_labels(labels)} {format_value(count)}'
+            )
+    return '\n'.join(lines) + '\n'
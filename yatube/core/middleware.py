@@ -0,0 +1,229 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth.middleware import get_user
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject
+
+from . import identity, memory, metrics, profiling, slow_queries
+from .cache import remember
+from .instrumentation import RequestStats, collect
+
+logger = logging.getLogger('yatube.timing')
+
+
+def cache_results(stats):
+    """Попадания и промахи кеша за запрос: {префикс: {hit: n, miss: m}}."""
+    results = {}
+    for (prefix, result), count in stats.cache_results.items():
+        results.setdefault(prefix, {})[result] = count
+    return results
+
+
+class MetricsMiddleware:
+    """Считает запросы, их длительность и обращения к базе по view.
+
+    Значения копятся без блокировок в счётчиках потока и периодически
+    сбрасываются в METRICS_DIR, откуда их собирает /metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = []
+
+        def counter(execute, sql, params, many, context):
+            queries.append(None)
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.inc(
+            'yatube_requests_total', view=view, method=request.method,
+            status=response.status_code,
+        )
+        metrics.observe('yatube_request_duration_seconds', elapsed, view=view)
+        metrics.inc('yatube_db_queries_total', len(queries), view=view)
+        metrics.flush()
+        return response
+
+
+class IdentityMapMiddleware:
+    """Открывает карту идентичности на время запроса.
+
+    Ставится после AuthenticationMiddleware: request.user попадает в
+    карту, поэтому автор поста или профиль самого пользователя — тот же
+    экземпляр, что и request.user, без повторной загрузки.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with identity.scope():
+            request.user = SimpleLazyObject(
+                lambda: remember(get_user(request))
+            )
+            return self.get_response(request)
+
+
+class ServerTimingMiddleware:
+    """Измеряет запросы к базе, рендер шаблонов и кеш.
+
+    Для доли SERVER_TIMING_SAMPLE_RATE запросов пишет строку JSON в лог
+    yatube.timing и, если включён SERVER_TIMING_HEADER, добавляет
+    заголовок Server-Timing. Повторы одного шаблона SQL не реже
+    N_PLUS_ONE_THRESHOLD раз помечаются как N+1.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.SERVER_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        stats = RequestStats()
+        start = time.perf_counter()
+        with collect(stats), connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+        self.log(request, response, stats, total)
+        if not settings.SERVER_TIMING_HEADER:
+            return response
+        response['Server-Timing'] = ', '.join((
+            'db;dur={:.1f};desc="{} queries"'.format(
+                stats.db_time * 1000, stats.queries
+            ),
+            'tpl;dur={:.1f}'.format(stats.template_time * 1000),
+            'cache;dur={:.1f};desc="{} calls"'.format(
+                stats.cache_time * 1000, stats.cache_calls
+            ),
+            'total;dur={:.1f}'.format(total * 1000),
+        ))
+        return response
+
+    def log(self, request, response, stats, total):
+        repeated = stats.repeated(settings.N_PLUS_ONE_THRESHOLD)
+        match = request.resolver_match
+        record = {
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': stats.queries,
+            'duplicates': stats.duplicates(),
+            'db_ms': round(stats.db_time * 1000, 2),
+            'template_ms': round(stats.template_time * 1000, 2),
+            'cache_ms': round(stats.cache_time * 1000, 2),
+            'cache_calls': stats.cache_calls,
+            'cache': cache_results(stats),
+            'total_ms': round(total * 1000, 2),
+        }
+        if repeated:
+            record['n_plus_one'] = repeated
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+
+class TemplateProfilerMiddleware:
+    """Профилирует рендер шаблонов по ?profile=templates.
+
+    Включается настройкой TEMPLATE_PROFILING и доступен персоналу
+    (или всем при DEBUG). Вместо страницы отдаёт folded stacks для
+    flamegraph.pl, с &format=summary — таблицу по шаблонам и тегам.
+    """
+
+    def __init__(self, get_response):
+        if not settings.TEMPLATE_PROFILING:
+            raise MiddlewareNotUsed
+        profiling.install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (request.GET.get('profile') != 'templates'
+                or not (settings.DEBUG or request.user.is_staff)):
+            return self.get_response(request)
+        profile = profiling.start(request.path)
+        try:
+            self.get_response(request)
+        finally:
+            profiling.stop()
+        if request.GET.get('format') == 'summary':
+            content = profile.as_summary()
+        else:
+            content = profile.as_folded()
+        return HttpResponse(content, content_type='text/plain; charset=utf-8')
+
+
+class SlowQueryMiddleware:
+    """Пишет запросы дольше SLOW_QUERY_THRESHOLD_MS в лог и в SlowQuery.
+
+    Запросы копятся во время обработки и записываются после ответа,
+    чтобы EXPLAIN и обновление статистики не попадали в обёртку.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_THRESHOLD_MS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+        slow = []
+
+        def wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = time.perf_counter() - start
+                if elapsed >= threshold:
+                    slow.append((sql, None if many else params, elapsed))
+
+        with connection.execute_wrapper(wrapper):
+            response = self.get_response(request)
+        if slow:
+            match = request.resolver_match
+            view = match.view_name if match else request.path
+            for sql, params, elapsed in slow:
+                slow_queries.record(sql, params, elapsed, view)
+        return response
+
+
+class MemoryProfilerMiddleware:
+    """Снимает tracemalloc до и после запросов к MEMORY_PROFILE_VIEWS.
+
+    Включается настройкой MEMORY_PROFILING: трассировка заметно
+    замедляет процесс. Разницу снимков копит core.memory, отчёт
+    отдаёт представление core.views.memory_profile и команда
+    memory_profile.
+    """
+
+    def __init__(self, get_response):
+        if not settings.MEMORY_PROFILING:
+            raise MiddlewareNotUsed
+        memory.start(settings.MEMORY_TRACE_FRAMES)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        before = getattr(request, '_memory_snapshot', None)
+        if before is not None:
+            memory.record(
+                request.resolver_match.view_name, before, memory.snapshot()
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.resolver_match.view_name in settings.MEMORY_PROFILE_VIEWS:
+            request._memory_snapshot = memory.snapshot()
@@ -11,3 +11,28 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class SlowQuery(CreatedModel):
+    """Накопленная статистика медленных запросов одного вида."""
+    fingerprint_hash = models.CharField(
+        'Хеш отпечатка',
+        max_length=32,
+        unique=True,
+    )
+    fingerprint = models.TextField('Нормализованный SQL')
+    sql = models.TextField('Пример запроса')
+    plan = models.TextField('План запроса', blank=True)
+    view = models.CharField('Представление', max_length=200, blank=True)
+    count = models.PositiveIntegerField('Количество', default=0)
+    total_time = models.FloatField('Суммарное время, мс', default=0)
+    max_time = models.FloatField('Наибольшее время, мс', default=0)
+    last_seen = models.DateTimeField('Последний раз', auto_now=True)
+
+    class Meta:
+        ordering = ('-total_time',)
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+
+    def __str__(self):
+        return self.fingerprint[:100]
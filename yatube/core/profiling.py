@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.template.base import Node, TextNode, VariableNode
+
+_local = threading.local()
+_original_render_annotated = Node.render_annotated
+LABEL_BITS: int = 2
+
+
+def node_label(node):
+    """Подпись узла: переменная с фильтрами или тег с первым аргументом."""
+    token = getattr(node, 'token', None)
+    if token is None:
+        return type(node).__name__
+    if isinstance(node, VariableNode):
+        return '{{ %s }}' % token.contents
+    return '{%% %s %%}' % ' '.join(token.split_contents()[:LABEL_BITS])
+
+
+def node_template(node):
+    origin = getattr(node, 'origin', None)
+    return getattr(origin, 'template_name', None) or '<string>'
+
+
+class TemplateProfile:
+    """Время рендера узлов шаблонов за один запрос."""
+
+    def __init__(self, root):
+        self.root = root
+        self.stack = []
+        self.folded = Counter()
+        self.template_time = Counter()
+        self.calls = Counter()
+        self.cumulative = defaultdict(float)
+
+    def enter(self, node):
+        self.stack.append([node_label(node), node_template(node), 0.0])
+
+    def leave(self, elapsed):
+        label, template, child_time = self.stack.pop()
+        own_time = elapsed - child_time
+        frames = [self.root]
+        previous = None
+        for frame_label, frame_template, _ in self.stack + [
+            [label, template, 0.0]
+        ]:
+            if frame_template != previous:
+                frames.append(frame_template)
+                previous = frame_template
+            frames.append(frame_label)
+        self.folded[';'.join(
+            frame.replace(';', ',') for frame in frames
+        )] += own_time
+        self.template_time[template] += own_time
+        self.calls[label] += 1
+        self.cumulative[label] += elapsed
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+    def as_folded(self):
+        """Формат folded stacks для flamegraph.pl и speedscope, в мкс."""
+        return ''.join(
+            '{} {}\n'.format(stack, max(1, round(seconds * 1e6)))
+            for stack, seconds in sorted(self.folded.items())
+        )
+
+    def as_summary(self):
+        lines = ['Шаблоны, собственное время, мс:']
+        lines.extend(
+            '  {:<60} {:>10.3f}'.format(template, seconds * 1000)
+            for template, seconds in self.template_time.most_common()
+        )
+        lines.append('Теги и переменные: вызовы, суммарное время, мс:')
+        lines.extend(
+            '  {:<60} {:>6} {:>10.3f}'.format(
+                label, self.calls[label], seconds * 1000
+            )
+            for label, seconds in sorted(
+                self.cumulative.items(), key=lambda item: -item[1]
+            )
+        )
+        return '\n'.join(lines) + '\n'
+
+
+def active():
+    return getattr(_local, 'profile', None)
+
+
+def profiled_render_annotated(node, context):
+    profile = active()
+    if profile is None or isinstance(node, TextNode):
+        return _original_render_annotated(node, context)
+    profile.enter(node)
+    start = time.perf_counter()
+    try:
+        return _original_render_annotated(node, context)
+    finally:
+        profile.leave(time.perf_counter() - start)
+
+
+def install():
+    """Подменяет Node.render_annotated; вне профилируемого запроса
+    подмена стоит одну проверку thread-local."""
+    Node.render_annotated = profiled_render_annotated
+
+
+def start(root):
+    _local.profile = TemplateProfile(root)
+    return _local.profile
+
+
+def stop():
+    _local.profile = None
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import logging
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .instrumentation import fingerprint
+from .models import SlowQuery
+
+logger = logging.getLogger('yatube.slow_queries')
+
+
+def explain(sql, params):
+    """План выполнения SELECT или пустая строка для прочих запросов."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else (
+        'EXPLAIN '
+    )
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except Exception as error:
+        return f'EXPLAIN не удался: {error}'
+    if connection.vendor == 'sqlite':
+        return '\n'.join(row[-1] for row in rows)
+    return '\n'.join(' '.join(str(col) for col in row) for row in rows)
+
+
+def record(sql, params, elapsed, view):
+    """Пишет медленный запрос в лог и добавляет его в статистику."""
+    normalized = fingerprint(sql)
+    key = hashlib.md5(normalized.encode()).hexdigest()
+    elapsed_ms = elapsed * 1000
+    updated = SlowQuery.objects.filter(fingerprint_hash=key).update(
+        count=F('count') + 1,
+        total_time=F('total_time') + elapsed_ms,
+        max_time=Greatest('max_time', elapsed_ms),
+        view=view,
+        last_seen=timezone.now(),
+    )
+    plan = None
+    if not updated:
+        plan = explain(sql, params)
+        try:
+            with transaction.atomic():
+                SlowQuery.objects.create(
+                    fingerprint_hash=key,
+                    fingerprint=normalized,
+                    # Параметры не сохраняются: в них бывают личные данные.
+                    sql=sql,
+                    plan=plan,
+                    view=view,
+                    count=1,
+                    total_time=elapsed_ms,
+                    max_time=elapsed_ms,
+                )
+        except IntegrityError:
+            return record(sql, params, elapsed, view)
+    logger.warning(json.dumps({
+        'fingerprint': key,
+        'sql': normalized,
+        'ms': round(elapsed_ms, 2),
+        'view': view,
+        'plan': plan,
+    }, ensure_ascii=False))
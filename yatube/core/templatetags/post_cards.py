@@ -0,0 +1,130 @@
+import hashlib
+import re
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from core.cache import remember_related
+from core.thumbnails import prefetch
+from posts.cache import follow_set, is_following
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post.html'
+CARD_KEY = 'card:{}:{}'
+# Увеличить при изменении разметки карточки.
+CARD_VERSION: int = 2
+FLAGS = ('index_link', 'group_list_link', 'detail_link', 'follow_link')
+# Совпадает с {% thumbnail %} в CARD_TEMPLATE.
+CARD_THUMBNAIL = ('960x339', {'crop': 'center', 'upscale': True})
+# Метка в карточке, которую {% follow_buttons %} заменяет ссылкой подписки.
+FOLLOW_MARKER_RE = re.compile(r'<!--follow (\d+) ([\w.@+-]+)-->')
+
+
+def follow_button(user, followed, author_id, username):
+    """Ссылка подписки для читателя: пусто на его же постах."""
+    if author_id == user.pk:
+        return ''
+    if is_following(followed, author_id):
+        url, text = 'posts:profile_unfollow', 'отписаться'
+    else:
+        url, text = 'posts:profile_follow', 'подписаться'
+    return format_html(
+        '<li><a href="{}">{}</a></li>', reverse(url, args=(username,)), text
+    )
+
+
+def card_key(post, flags):
+    """Ключ карточки — отпечаток всего, что она показывает, поэтому любая
+    значимая запись в пост, автора или группу даёт новый ключ. От читателя
+    карточка не зависит: вместо ссылки подписки в ней метка."""
+    raw = repr((
+        CARD_VERSION,
+        [flag for flag in FLAGS if flags.get(flag)],
+        post.text,
+        str(post.image),
+        post.pub_date.isoformat(),
+        post.group.slug if post.group_id else None,
+        post.author.username,
+        post.author.get_full_name(),
+    ))
+    return CARD_KEY.format(post.pk, hashlib.md5(raw.encode()).hexdigest())
+
+
+@register.simple_tag
+def post_cards(posts, **flags):
+    """Карточки постов из кеша одним get_many; рендерятся только промахи.
+    Карточки с follow_link выводятся внутри {% follow_buttons %}.
+
+        {% post_cards page_obj index_link=True as cards %}
+        {% for card in cards %}{{ card }}{% endfor %}
+    """
+    posts = list(posts)
+    keys = []
+    for post in posts:
+        remember_related(post)
+        keys.append(card_key(post, flags))
+    found = cache.get_many(keys)
+    geometry, options = CARD_THUMBNAIL
+    prefetch(
+        [
+            post.image for post, key in zip(posts, keys)
+            if key not in found and post.image
+        ],
+        geometry, **options
+    )
+    missing = {}
+    cards = []
+    card_template = None
+    for post, key in zip(posts, keys):
+        card = found.get(key)
+        if card is None:
+            if card_template is None:
+                card_template = get_template(CARD_TEMPLATE)
+            card = card_template.render({'post': post, **flags})
+            missing[key] = card
+        cards.append(mark_safe(card))
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIME)
+    return cards
+
+
+class FollowButtonsNode(template.Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        html = self.nodelist.render(context)
+        if '<!--follow ' not in html:
+            return html
+        user = context.get('user')
+        if user is None or not user.is_authenticated:
+            return FOLLOW_MARKER_RE.sub('', html)
+        followed = follow_set(user)
+        return FOLLOW_MARKER_RE.sub(
+            lambda match: follow_button(
+                user, followed, int(match.group(1)), match.group(2)
+            ),
+            html,
+        )
+
+
+@register.tag('follow_buttons')
+def do_follow_buttons(parser, token):
+    """Подставляет в карточки ссылки подписки текущего читателя.
+
+    Карточки и закешированные фрагменты общие для всех, поэтому ссылка
+    подписки рендерится поверх них на каждый запрос:
+
+        {% follow_buttons %}
+            {% swr_cache 20 posts request.path page_obj.number %}...
+        {% endfollow_buttons %}
+    """
+    nodelist = parser.parse(('endfollow_buttons',))
+    parser.delete_first_token()
+    return FollowButtonsNode(nodelist)
@@ -0,0 +1,48 @@
+"""Окружение тестов: свои каталоги общего кеша и метрик вместо каталогов
+проекта."""
+import copy
+import logging
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def isolated_cache():
+    """Общий уровень кеша и метрики во временных каталогах, удаляемых
+    после тестов: cache.clear() и счётчики тестов не трогают запущенное
+    приложение."""
+    location = tempfile.mkdtemp(prefix='yatube-test-cache-')
+    metrics_dir = tempfile.mkdtemp(prefix='yatube-test-metrics-')
+    caches = copy.deepcopy(settings.CACHES)
+    caches['shared']['LOCATION'] = location
+    try:
+        with override_settings(CACHES=caches, METRICS_DIR=metrics_dir):
+            yield location
+    finally:
+        shutil.rmtree(location, ignore_errors=True)
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Строка на каждый запрос засоряет вывод тестов; предупреждения
+        # о N+1 остаются видны. Через LOGGING, чтобы уровень пережил
+        # повторный django.setup() при импорте yatube.wsgi.
+        config = copy.deepcopy(settings.LOGGING)
+        config['loggers']['yatube.timing']['level'] = 'WARNING'
+        self._quiet_timing = override_settings(LOGGING=config)
+        self._quiet_timing.enable()
+        logging.getLogger('yatube.timing').setLevel(logging.WARNING)
+        self._isolated_cache = isolated_cache()
+        self._isolated_cache.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._isolated_cache.__exit__(None, None, None)
+        self._quiet_timing.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,5 +1,53 @@
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
 from http import HTTPStatus
-from django.test import TestCase
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY, get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import CommandError, call_command
+from django.core.cache.utils import make_template_fragment_key
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import (Context, Template, TemplateSyntaxError,
+                             engines)
+from django.db import connection
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from core import identity, memory, metrics
+from core.cache import (InstrumentedCache, SharedFileCache, TieredCache,
+                        get_or_compute, key_prefix)
+from core.instrumentation import RequestStats, collect, fingerprint, timed
+from core.management.commands.loadtest import Command as LoadTest
+from core.management.commands.loadtest import percentile
+from core.models import SlowQuery
+from core.management.commands.render_benchmark import templates_setting
+from core.template_backend import TimedDjangoTemplates
+from core.templatetags.post_cards import CARD_THUMBNAIL
+from core.warmup import project_templates, warm_up
+from posts.cache import cached_posts, cached_users
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 class ViewTestClass(TestCase):
@@ -7,3 +55,724 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='timer')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def test_server_timing_header(self):
+        """Ответ содержит время базы, шаблонов и кеша."""
+        response = self.client.get('/')
+        header = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;dur=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_not_sampled_request(self):
+        """Невыбранный запрос не измеряется."""
+        response = self.client.get('/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_timing_logged_without_header(self):
+        """Без заголовка замер запроса всё равно пишется в лог."""
+        with self.assertLogs('yatube.timing', 'INFO') as logs:
+            response = self.client.get('/')
+        self.assertFalse(response.has_header('Server-Timing'))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['path'], '/')
+
+    def test_fingerprint_normalizes_literals(self):
+        """Отпечаток SQL не зависит от литералов и длины списков IN."""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = 1 AND b = 'x'"),
+            fingerprint("SELECT * FROM t WHERE a = 25 AND b = 'yy'"),
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s)'),
+        )
+
+    def test_repeated_queries_flagged(self):
+        """Повторяющиеся шаблоны запросов помечаются как N+1."""
+        stats = RequestStats()
+
+        def execute(sql, params, many, context):
+            return None
+
+        for pk in range(3):
+            stats(execute, 'SELECT * FROM t WHERE id = %s', (pk,), False, {})
+        stats(execute, 'SELECT * FROM t WHERE id = %s', (0,), False, {})
+        self.assertEqual(stats.duplicates(), 1)
+        self.assertEqual(
+            stats.repeated(4), {'SELECT * FROM t WHERE id = %s': 4}
+        )
+
+    def test_nested_timed_counted_once(self):
+        """Вложенный замер того же счётчика не удваивает время."""
+        stats = RequestStats()
+        with collect(stats):
+            start = time.perf_counter()
+            with timed('template_time'):
+                with timed('template_time'):
+                    time.sleep(0.01)
+            total = time.perf_counter() - start
+        self.assertGreater(stats.template_time, 0.01)
+        self.assertLessEqual(stats.template_time, total)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPrefetchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='painter')
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        for i in range(6):
+            Post.objects.create(
+                author=cls.user, text=f'Пост {i}', image=SimpleUploadedFile(
+                    f'small_{i}.gif', small_gif, content_type='image/gif'
+                ),
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_page_thumbnails_fetched_once(self):
+        """Записи kvstore миниатюр страницы читаются одним запросом."""
+        geometry, options = CARD_THUMBNAIL
+        for post in Post.objects.all():
+            get_thumbnail(post.image, geometry, **options)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/')
+        self.assertEqual(len([
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]), 1)
+
+
+class LoadTestTests(TestCase):
+    def test_percentile_nearest_rank(self):
+        """Перцентили считаются методом ближайшего ранга."""
+        ordered = list(range(1, 101))
+        for percent, expected in ((50, 50), (95, 95), (99, 99)):
+            with self.subTest(percent=percent):
+                self.assertEqual(percentile(ordered, percent), expected)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_sessions_follow_seed(self):
+        """С одним и тем же seed сессии получают те же пользователи."""
+        users = [
+            User.objects.create_user(username=f'load_{i}') for i in range(30)
+        ]
+        Post.objects.create(author=users[0], text='Тестовый пост')
+        SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+        runs = []
+        for _ in range(2):
+            command = LoadTest()
+            command.rng = random.Random(7)
+            command.prepare()
+            runs.append([
+                SessionStore(cookie.split(';')[0].split('=')[1])[SESSION_KEY]
+                for cookie, _ in command.sessions
+            ])
+        self.assertEqual(runs[0], runs[1])
+
+
+@override_settings(TEMPLATE_PROFILING=True)
+class TemplateProfilerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(
+            username='profiler', is_staff=True
+        )
+        cls.user = User.objects.create_user(username='not_staff')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_folded_stacks(self):
+        """Профиль отдаётся в формате folded stacks."""
+        response = self.staff_client.get('/', {'profile': 'templates'})
+        content = response.content.decode()
+        self.assertIn(
+            '{% post_cards page_obj %};posts/includes/post.html;', content
+        )
+        for line in content.splitlines():
+            with self.subTest(line=line):
+                self.assertTrue(line.rsplit(' ', 1)[1].isdigit())
+
+    def test_summary(self):
+        """Сводка содержит время по шаблонам и число вызовов тегов."""
+        response = self.staff_client.get(
+            '/', {'profile': 'templates', 'format': 'summary'}
+        )
+        content = response.content.decode()
+        self.assertIn('posts/includes/post.html', content)
+        self.assertIn('{{ post.text|linebreaksbr }}', content)
+
+    @override_settings(DEBUG=False)
+    def test_profile_staff_only(self):
+        """Обычный пользователь получает страницу вместо профиля."""
+        response = self.authorized_client.get('/', {'profile': 'templates'})
+        self.assertTemplateUsed(response, 'posts/index.html')
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0.000001)
+class SlowQueryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='slow')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_slow_queries_aggregated(self):
+        """Медленные запросы копятся по отпечаткам вместе с планом."""
+        with self.assertLogs('yatube.slow_queries', 'WARNING'):
+            self.client.get('/')
+            self.client.get('/')
+        query = SlowQuery.objects.filter(
+            fingerprint__startswith='SELECT COUNT(*)',
+            fingerprint__contains='FROM "posts_post"',
+        ).first()
+        self.assertIsNotNone(query)
+        self.assertEqual(query.count, 2)
+        self.assertEqual(query.view, 'posts:index')
+        self.assertIn('posts_post', query.plan)
+        self.assertGreaterEqual(query.total_time, query.max_time)
+
+    def test_slow_query_redacted_and_touched(self):
+        """Пример запроса хранится без параметров, last_seen обновляется."""
+        with self.assertLogs('yatube.slow_queries', 'WARNING'):
+            self.client.get('/profile/slow/')
+        query = SlowQuery.objects.filter(
+            fingerprint__contains='"auth_user"."username" = %s'
+        ).first()
+        self.assertNotIn("'slow'", query.sql)
+        self.assertIn('%s', query.sql)
+        seen = query.last_seen
+        with self.assertLogs('yatube.slow_queries', 'WARNING'):
+            self.client.get('/profile/slow/')
+        query.refresh_from_db()
+        self.assertGreater(query.last_seen, seen)
+
+    def test_slow_queries_command(self):
+        """Команда выводит статистику и очищает её."""
+        with self.assertLogs('yatube.slow_queries', 'WARNING'):
+            self.client.get('/')
+        out = StringIO()
+        call_command('slow_queries', '--plans', stdout=out)
+        self.assertIn('posts:index', out.getvalue())
+        call_command('slow_queries', '--reset', stdout=StringIO())
+        self.assertFalse(SlowQuery.objects.exists())
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.metrics_dir = tempfile.TemporaryDirectory()
+        cls.settings_override = override_settings(
+            METRICS_DIR=cls.metrics_dir.name
+        )
+        cls.settings_override.enable()
+        cls.user = User.objects.create_user(username='metrics')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.metrics_dir.cleanup()
+        super().tearDownClass()
+
+    def test_request_metrics(self):
+        """Запросы, их длительность и обращения к базе видны по view."""
+        self.client.get('/')
+        content = self.client.get('/metrics').content.decode()
+        for line in (
+            '# TYPE yatube_request_duration_seconds histogram',
+            'yatube_request_duration_seconds_bucket{view="posts:index",'
+            'le="+Inf"}',
+            'yatube_requests_total{method="GET",status="200",'
+            'view="posts:index"}',
+            'yatube_db_queries_total{view="posts:index"}',
+            'yatube_cache_requests_total{prefix="template.cache.posts",'
+            'result=',
+            'yatube_db_connections ',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, content)
+
+    def test_other_processes_summed(self):
+        """Счётчики из файлов других процессов складываются с местными."""
+        with open(os.path.join(self.metrics_dir.name, '1.json'), 'w') as file:
+            json.dump({
+                'counters': [['yatube_db_queries_total', [['view', 'x']], 3]],
+                'gauges': [],
+            }, file)
+        metrics.inc('yatube_db_queries_total', 2, view='x')
+        values = metrics.collect()
+        self.assertGreaterEqual(
+            values[('yatube_db_queries_total', (('view', 'x'),))], 5
+        )
+
+    def test_dead_processes_merged(self):
+        """Файлы завершившихся процессов сливаются в один, их счётчики
+        продолжают учитываться."""
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        metrics.write(metrics.path_for(process.pid), {
+            'counters': [['yatube_db_queries_total', [['view', 'dead']], 4]],
+            'gauges': [['yatube_db_connections', [], 100]],
+        })
+        key = ('yatube_db_queries_total', (('view', 'dead'),))
+        for _ in range(2):
+            values = metrics.collect()
+            self.assertEqual(values[key], 4)
+            self.assertLess(values[('yatube_db_connections', ())], 100)
+        self.assertNotIn(
+            f'{process.pid}.json', os.listdir(self.metrics_dir.name)
+        )
+
+    def test_render_keeps_precision(self):
+        """Большие счётчики и дробные суммы выводятся без округления."""
+        content = metrics.render({
+            ('yatube_db_queries_total', (('view', 'x'),)): 12345678,
+            ('yatube_db_connections', ()): 0.1234567891,
+        })
+        self.assertIn('yatube_db_queries_total{view="x"} 12345678.0', content)
+        self.assertIn('yatube_db_connections 0.1234567891', content)
+
+    @override_settings(METRICS_ALLOWED_IPS=())
+    def test_metrics_forbidden(self):
+        """Без DEBUG метрики отдаются только адресам из списка."""
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+
+class InstrumentedCacheTests(TestCase):
+    def setUp(self):
+        self.cache = InstrumentedCache('', {'OPTIONS': {'TARGET': 'shared'}})
+        self.cache._target = LocMemCache('instrumented-test', {
+            'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_FREQUENCY': 1},
+        })
+
+    def test_key_prefix(self):
+        """Ключи группируются по фрагменту, cache_page и части до «:»."""
+        cases = {
+            'template.cache.posts.0123abcd': 'template.cache.posts',
+            'views.decorators.cache.cache_page..GET.a.b.ru':
+                'views.decorators.cache',
+            'stamp:posts:group:slug': 'stamp',
+            'sorl-thumbnail||image||0123abcd': 'sorl-thumbnail',
+            'nocolon': 'nocolon',
+        }
+        for key, prefix in cases.items():
+            with self.subTest(key=key):
+                self.assertEqual(key_prefix(key), prefix)
+
+    def test_stats_by_prefix(self):
+        """Попадания, промахи, записи и размеры считаются по префиксу."""
+        before = self.cache.stats().get('stats-test', {})
+        self.cache.set('stats-test:a', 'x' * 100)
+        self.cache.get('stats-test:a')
+        self.cache.get('stats-test:b')
+        self.cache.get_many(['stats-test:a', 'stats-test:c'])
+        after = self.cache.stats()['stats-test']
+        for field, delta in (('hits', 2), ('misses', 2), ('sets', 1)):
+            with self.subTest(field=field):
+                self.assertEqual(after[field] - before.get(field, 0), delta)
+        self.assertGreater(after['bytes'] - before.get('bytes', 0), 100)
+        self.assertGreater(after['seconds'], 0)
+
+    def test_evictions(self):
+        """Промах по вытесненному, но не истёкшему ключу — вытеснение."""
+        before = self.cache.stats().get('evict-test', {})
+        self.cache.set_many({'evict-test:a': 1, 'evict-test:b': 2})
+        self.cache.set('evict-test:c', 3)
+        self.cache.delete('evict-test:c')
+        for key in ('evict-test:a', 'evict-test:b', 'evict-test:c'):
+            self.cache.get(key)
+        after = self.cache.stats()['evict-test']
+        self.assertEqual(
+            after['evictions'] - before.get('evictions', 0), 2
+        )
+
+
+class WarmUpTests(TestCase):
+    def test_warm_up_steps(self):
+        """Прогрев проходит все шаги и сообщает их время."""
+        with self.assertLogs('yatube.startup', 'INFO'):
+            timings = warm_up()
+        self.assertEqual(set(timings), {
+            'resolver', 'templates', 'thumbnails', 'translations',
+        })
+
+    def test_only_project_templates(self):
+        """Прогреваются шаблоны проекта, но не админки."""
+        names = set(project_templates(engines.all()[0]))
+        self.assertIn('posts/index.html', names)
+        self.assertNotIn('admin/base.html', names)
+
+
+class CompileTemplatesTests(TestCase):
+    def test_all_templates_compile(self):
+        """Все шаблоны проекта компилируются."""
+        out = StringIO()
+        call_command('compile_templates', stdout=out)
+        self.assertIn('Скомпилировано шаблонов', out.getvalue())
+
+    def test_errors_reported(self):
+        """Ошибка компиляции выводится с именем шаблона."""
+        get_template = TimedDjangoTemplates.get_template
+
+        def broken(backend, name):
+            if name == 'posts/index.html':
+                raise TemplateSyntaxError('Invalid block tag')
+            return get_template(backend, name)
+
+        err = StringIO()
+        with mock.patch.object(
+            TimedDjangoTemplates, 'get_template', broken
+        ), self.assertRaises(CommandError):
+            call_command('compile_templates', stderr=err)
+        self.assertIn('posts/index.html: Invalid block tag', err.getvalue())
+
+    def test_cached_loader_setting(self):
+        """С кеширующим загрузчиком шаблон разбирается один раз."""
+        with override_settings(TEMPLATES=templates_setting(cached=True)):
+            engine = engines.all()[0]
+            self.assertIs(
+                engine.get_template('posts/index.html').template,
+                engine.get_template('posts/index.html').template,
+            )
+
+
+@override_settings(MEMORY_PROFILING=True)
+class MemoryProfilerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='memory')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        memory.reset()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def tearDown(self):
+        tracemalloc.stop()
+
+    def test_profiled_views_reported(self):
+        """Отчёт содержит профилируемые view и не содержит прочие."""
+        self.client.get('/')
+        self.client.get('/profile/memory/')
+        self.client.get('/posts/1/')
+        report = self.staff_client.get('/memory/').content.decode()
+        self.assertIn('posts:index: запросов 1', report)
+        self.assertIn('posts:profile: запросов 1', report)
+        self.assertNotIn('posts:post_detail', report)
+
+    def test_memory_view_staff_only(self):
+        """Отчёт доступен только персоналу."""
+        response = self.client.get('/memory/')
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+
+class SharedFileCacheTests(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+
+    def shared(self, **options):
+        return SharedFileCache(self.location, {'OPTIONS': {
+            'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2, **options,
+        }})
+
+    def test_permanent_entries_never_culled(self):
+        """При переполнении удаляются только записи со сроком."""
+        shared = self.shared(CULL_INTERVAL=0)
+        shared.set('stamp:posts', 1, None)
+        for i in range(10):
+            shared.set(f'card:{i}', i, 60)
+        self.assertEqual(shared.get('stamp:posts'), 1)
+        self.assertLessEqual(len(shared._list_cache_files()), 5)
+
+    def test_directory_listed_once_per_interval(self):
+        """Каталог перечисляется не на каждую запись."""
+        shared = self.shared(CULL_INTERVAL=60)
+        with mock.patch.object(
+            shared, '_list_cache_files', wraps=shared._list_cache_files
+        ) as listing:
+            shared.set_many({f'card:{i}': i for i in range(10)}, 60)
+        self.assertEqual(listing.call_count, 1)
+
+
+class TieredCacheTests(TestCase):
+    def setUp(self):
+        shared = LocMemCache('tiered-test', {})
+        shared.clear()
+        self.workers = []
+        for _ in range(2):
+            worker = TieredCache('', {'OPTIONS': {
+                'SHARED': 'shared', 'MAX_ENTRIES': 2, 'CHECK_INTERVAL': 0,
+            }})
+            worker._shared = shared
+            self.workers.append(worker)
+        self.shared = shared
+
+    def test_l1_serves_hits(self):
+        """Прочитанное из L2 значение дальше отдаётся из памяти процесса."""
+        first, _ = self.workers
+        self.shared.set('key', 'value')
+        self.assertEqual(first.get('key'), 'value')
+        self.shared.set('key', 'changed')
+        self.assertEqual(first.get('key'), 'value')
+
+    def test_l1_respects_version(self):
+        """Версии ключа в L1 не смешиваются."""
+        first, _ = self.workers
+        first.set('key', 'v1', version=1)
+        self.assertIsNone(first.get('key', version=2))
+        self.assertEqual(first.get('key', version=1), 'v1')
+
+    def test_l1_is_bounded(self):
+        """L1 вытесняет давно не читанные ключи."""
+        first, _ = self.workers
+        for key in ('a', 'b', 'c'):
+            first.set(key, key)
+        self.assertEqual(
+            list(first._local), [first.make_key(key) for key in ('b', 'c')]
+        )
+        self.assertEqual(first.get('a'), 'a')
+
+    def test_delete_propagates_to_other_workers(self):
+        """Удаление в одном процессе сбрасывает L1 остальных."""
+        first, second = self.workers
+        first.set('key', 'value')
+        self.assertEqual(first.get('key'), 'value')
+        second.delete('key')
+        self.assertIsNone(first.get('key'))
+
+    def test_delete_keeps_other_keys(self):
+        """Удаление ключа не сбрасывает остальные ключи в L1."""
+        first, second = self.workers
+        first.get('warm-up')
+        first.set('key', 'value')
+        first.set('other', 'value')
+        self.shared.set('other', 'changed')
+        second.delete('key')
+        self.assertIsNone(first.get('key'))
+        self.assertEqual(first.get('other'), 'value')
+
+    def test_lagging_worker_flushes_l1(self):
+        """Процесс, пропустивший часть журнала, сбрасывает L1 целиком."""
+        first, second = self.workers
+        second._log_size = 1
+        first.get('warm-up')
+        first.set('other', 'value')
+        self.shared.set('other', 'changed')
+        second.delete_many(['a', 'b'])
+        self.assertEqual(first.get('other'), 'changed')
+
+    def test_stamps_bypass_l1(self):
+        """Метки версий всегда читаются из общего кеша."""
+        first, second = self.workers
+        first.set('stamp:posts', 1, None)
+        second.set('stamp:posts', 2, None)
+        self.assertEqual(first.get('stamp:posts'), 2)
+        self.assertEqual(first.get_many(['stamp:posts']), {'stamp:posts': 2})
+
+
+class IdentityMapTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='identity')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий'
+        )
+
+    def test_object_loaded_once(self):
+        """За запрос объект загружается один раз и в одном экземпляре."""
+        with identity.scope():
+            with self.assertNumQueries(1):
+                by_name = cached_users.get(username='identity')
+                by_pk = cached_users.get(pk=self.user.pk)
+            post = cached_posts.get(pk=self.post.pk)
+        self.assertIs(by_name, by_pk)
+        self.assertIs(post.author, by_pk)
+
+    def test_no_map_outside_request(self):
+        """Вне запроса карта не используется."""
+        self.assertIsNot(
+            cached_users.get(pk=self.user.pk),
+            cached_users.get(pk=self.user.pk),
+        )
+
+    def test_forget_on_save(self):
+        """Записанный объект убирается из карты."""
+        with identity.scope():
+            user = cached_users.get(username='identity')
+            user.first_name = 'Имя'
+            user.save()
+            self.assertIsNone(identity.get(User, 'pk', user.pk))
+            self.assertIsNone(identity.get(User, 'username', 'identity'))
+
+    def test_post_detail_shares_user(self):
+        """Автор поста, автор комментария и request.user — один объект."""
+        self.client.force_login(self.user)
+        response = self.client.get(f'/posts/{self.post.pk}/')
+        post = response.context['post']
+        comment, = response.context['comments']
+        self.assertIs(comment.author, post.author)
+        self.assertIs(response.context['user']._wrapped, post.author)
+
+
+class SessionTests(TestCase):
+    def test_session_read_from_cache(self):
+        """Авторизованный запрос не читает таблицу сессий."""
+        user = User.objects.create_user(username='session')
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/create/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'django_session' in query['sql']
+        ])
+
+    def test_expired_sessions_cleared_in_batches(self):
+        """Истёкшие сессии удаляются пачками, живые остаются."""
+        now = timezone.now()
+        Session.objects.bulk_create([
+            Session(
+                session_key=f'expired{i}', session_data='',
+                expire_date=now - timedelta(days=1),
+            )
+            for i in range(5)
+        ] + [Session(
+            session_key='alive', session_data='',
+            expire_date=now + timedelta(days=1),
+        )])
+        out = StringIO()
+        call_command('clear_expired_sessions', batch_size=2, stdout=out)
+        self.assertIn('Удалено сессий: 5, пачек: 3', out.getvalue())
+        self.assertEqual(
+            list(Session.objects.values_list('pk', flat=True)), ['alive']
+        )
+
+
+class GetOrComputeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def compute(self):
+        self.calls.append(None)
+        return len(self.calls)
+
+    def test_fresh_value_not_recomputed(self):
+        """Свежее значение берётся из кеша."""
+        self.assertEqual(get_or_compute('swr-test', self.compute, 60), 1)
+        self.assertEqual(get_or_compute('swr-test', self.compute, 60), 1)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_stale_value_served_while_locked(self):
+        """Пока другой запрос пересчитывает, отдаётся устаревшее значение."""
+        cache.set('swr-test', ('stale', time.time() - 1, 0.1), 60)
+        cache.add('lock:swr-test', True, 10)
+        self.assertEqual(
+            get_or_compute('swr-test', self.compute, 60), 'stale'
+        )
+        self.assertFalse(self.calls)
+
+    def test_stale_value_recomputed_by_lock_holder(self):
+        """Взявший блокировку пересчитывает значение и снимает её."""
+        cache.set('swr-test', ('stale', time.time() - 1, 0.1), 60)
+        self.assertEqual(get_or_compute('swr-test', self.compute, 60), 1)
+        self.assertIsNone(cache.get('lock:swr-test'))
+
+    @override_settings(CACHE_LOCK_WAIT=0)
+    def test_waiter_keeps_foreign_lock(self):
+        """Не дождавшийся чужого результата не снимает чужую блокировку."""
+        cache.add('lock:swr-test', True, 10)
+        self.assertEqual(get_or_compute('swr-test', self.compute, 60), 1)
+        self.assertTrue(cache.get('lock:swr-test'))
+
+    @mock.patch('core.cache.random.random', return_value=0.5)
+    def test_early_refresh(self, _):
+        """Долгое вычисление обновляется до истечения срока свежести."""
+        cache.set('swr-test', ('old', time.time() + 5, 30.0), 60)
+        self.assertEqual(get_or_compute('swr-test', self.compute, 60), 1)
+        cache.set('swr-test', ('old', time.time() + 5, 0.001), 60)
+        self.assertEqual(
+            get_or_compute('swr-test', self.compute, 60), 'old'
+        )
+
+    def test_template_tag(self):
+        """Тег swr_cache кеширует фрагмент под ключом тега cache."""
+        template = Template(
+            '{% load swr_cache %}{% swr_cache 20 part name %}'
+            '{{ name }}{% endswr_cache %}'
+        )
+        self.assertEqual(template.render(Context({'name': 'a'})), 'a')
+        value, _, _ = cache.get(make_template_fragment_key('part', ['a']))
+        self.assertEqual(value, 'a')
+
+
+class WarmCacheTests(TransactionTestCase):
+    """Вне транзакции: запросы идут из потоков со своими соединениями."""
+
+    def test_pages_warmed(self):
+        """Прогреваются страницы index, группы и профили с подписчиками."""
+        cache.clear()
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        group = Group.objects.create(
+            title='Группа', slug='warm', description='Описание'
+        )
+        Post.objects.create(author=author, group=group, text='Тестовый пост')
+        before = cache.stats().get('card', {}).get('sets', 0)
+        out = StringIO()
+        call_command(
+            'warm_cache', pages=2, groups=5, profiles=5, concurrency=2,
+            stdout=out,
+        )
+        kinds = json.loads(out.getvalue())['kinds']
+        self.assertEqual(
+            {kind: summary['pages'] for kind, summary in kinds.items()},
+            {'index': 2, 'group': 1, 'profile': 1},
+        )
+        self.assertFalse(any(summary['errors'] for summary in kinds.values()))
+        self.assertGreater(cache.stats()['card']['sets'], before)
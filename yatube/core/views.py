@@ -1,5 +1,12 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from . import memory
+from . import metrics as counters
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +22,26 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    """Метрики всех процессов в текстовом формате Prometheus."""
+    address = request.META.get('REMOTE_ADDR')
+    if not (settings.DEBUG or address in settings.METRICS_ALLOWED_IPS):
+        raise PermissionDenied
+    return HttpResponse(
+        counters.render(counters.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+@staff_member_required
+def memory_profile(request):
+    """Отчёт профилировщика памяти этого процесса; ?reset=1 сбрасывает его
+    и запоминает снимок, от которого считается рост."""
+    if request.GET.get('reset'):
+        memory.reset()
+    return HttpResponse(
+        memory.report(settings.MEMORY_REPORT_LIMIT),
+        content_type='text/plain; charset=utf-8',
+    )
@@ -0,0 +1,96 @@
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import Resolver404, get_resolver
+from django.utils import translation
+
+logger = logging.getLogger('yatube.startup')
+MISSING_PATH = '/__warm_up__/'
+
+
+def warm_resolver():
+    """Компилирует регулярные выражения всех маршрутов и словари reverse."""
+    resolver = get_resolver()
+    try:
+        resolver.resolve(MISSING_PATH)
+    except Resolver404:
+        pass
+    resolver.reverse_dict
+    for _, namespace in resolver.namespace_dict.values():
+        namespace.reverse_dict
+
+
+def project_templates(engine):
+    """Имена шаблонов проекта; шаблоны сторонних приложений не нужны."""
+    for directory in engine.template_dirs:
+        if not directory.startswith(settings.BASE_DIR):
+            continue
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(('.html', '.txt', '.xml')):
+                    yield os.path.relpath(
+                        os.path.join(root, filename), directory
+                    )
+
+
+def compile_templates():
+    """Компилирует шаблоны проекта во всех движках.
+
+    Возвращает число скомпилированных шаблонов и список ошибок
+    (имя шаблона, текст ошибки).
+    """
+    count, errors = 0, []
+    for engine in engines.all():
+        for name in sorted(set(project_templates(engine))):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as error:
+                errors.append((name, str(error)))
+            else:
+                count += 1
+    return count, errors
+
+
+def warm_templates():
+    """Загружает шаблоны проекта; с кеширующим загрузчиком — компилирует
+    их на весь срок жизни процесса."""
+    count, errors = compile_templates()
+    for name, error in errors:
+        logger.warning('Шаблон %s не скомпилирован: %s', name, error)
+    return count
+
+
+def warm_thumbnails():
+    """Создаёт бэкенд, движок и хранилище sorl-thumbnail; движок
+    импортирует Pillow."""
+    from sorl.thumbnail import default
+
+    for lazy in (default.backend, default.engine, default.kvstore):
+        lazy.__class__
+
+
+def warm_up():
+    """Выполняет работу первого запроса заранее, до форка воркеров.
+
+    Соединения с базой закрываются, чтобы воркеры не делили сокеты.
+    """
+    timings = {}
+    for name, step in (
+        ('resolver', warm_resolver),
+        ('templates', warm_templates),
+        ('thumbnails', warm_thumbnails),
+        ('translations', lambda: translation.activate(
+            settings.LANGUAGE_CODE
+        )),
+    ):
+        start = time.perf_counter()
+        step()
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    translation.deactivate()
+    connections.close_all()
+    logger.info('Прогрев, мс: %s', timings)
+    return timings
@@ -12,10 +12,21 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        field = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'group':
+            # Выбор группы в list_editable строится для каждой строки:
+            # список групп читается один раз на запрос.
+            if not hasattr(request, '_group_choices'):
+                request._group_choices = list(field.choices)
+            field.choices = request._group_choices
+        return field
+
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = (
@@ -25,6 +36,7 @@ class CommentAdmin(admin.ModelAdmin):
         'text',
         'created'
     )
+    list_select_related = ('post', 'author')
     list_filter = ('author',)
     search_fields = ('author', 'created')
 
@@ -35,6 +47,7 @@ class FollowAdmin(admin.ModelAdmin):
         'user',
         'author'
     )
+    list_select_related = ('user', 'author')
     list_filter = ('author',)
     search_fields = ('author', 'user')
 
@@ -0,0 +1,69 @@
+"""Имена меток версий, которые сдвигаются при записи постов, и кеши
+объектов приложения."""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.cache import ObjectCache
+
+from .models import Follow, Group, Post, User
+
+FOLLOWS_KEY = 'follows:{}'
+
+# Хеш пароля и почта не должны попадать в pickle на диске.
+cached_users = ObjectCache(
+    User, natural_keys=('username',),
+    fields=('username', 'first_name', 'last_name'),
+)
+cached_groups = ObjectCache(Group, natural_keys=('slug',))
+cached_posts = ObjectCache(Post, related=('author', 'group'))
+
+
+def index_stamp():
+    return 'posts'
+
+
+def group_stamp(slug):
+    return f'posts:group:{slug}'
+
+
+def author_stamp(username):
+    return f'posts:author:{username}'
+
+
+def follow_set(user):
+    """Отсортированный array('I') id авторов, на которых подписан user.
+
+    Хранится в кеше целиком и обновляется сигналами Follow, поэтому
+    проверка подписки и лента подписок не обращаются к Follow.
+    """
+    if not user.is_authenticated:
+        return array('I')
+    ids = cache.get(FOLLOWS_KEY.format(user.pk))
+    if ids is None:
+        ids = refresh_follow_set(user.pk, replace=False)
+    return ids
+
+
+def refresh_follow_set(user_id, replace=True):
+    """Читает подписки из базы и кладёт их в кеш после фиксации.
+
+    При промахе чтения (replace=False) набор только добавляется: если
+    сигнал Follow успел записать более свежий, устаревшее чтение его не
+    затрёт.
+    """
+    ids = array('I', Follow.objects.author_ids(user_id))
+    store = cache.set if replace else cache.add
+    transaction.on_commit(lambda: store(
+        FOLLOWS_KEY.format(user_id), ids, settings.FOLLOW_SET_CACHE_TIME
+    ))
+    return ids
+
+
+def is_following(ids, author_id):
+    """Есть ли author_id в отсортированном массиве из follow_set."""
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
@@ -0,0 +1,137 @@
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from core.cache import conditional_stamps, stamp_headers
+
+from .cache import (author_stamp, cached_groups, cached_users, group_stamp,
+                    index_stamp)
+from .models import Post
+
+
+class LatestPostsFeed(Feed):
+    title = 'Yatube: последние обновления'
+    link = reverse_lazy('posts:index')
+    description = 'Последние записи всех авторов Yatube'
+
+    def items(self):
+        return Post.objects.select_related(
+            'author', 'group'
+        )[:settings.FEED_COUNT]
+
+    def item_title(self, item):
+        return Truncator(item.text).chars(settings.FEED_TITLE_LENGTH)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=(item.pk,))
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(cached_groups, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=(obj.slug,))
+
+    def description(self, obj):
+        return obj.description
+
+    def items(self, obj):
+        return obj.posts.select_related(
+            'author', 'group'
+        )[:settings.FEED_COUNT]
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(cached_users, username=username)
+
+    def title(self, obj):
+        return f'Yatube: {obj.get_full_name() or obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=(obj.username,))
+
+    def description(self, obj):
+        return f'Записи пользователя {obj.username}'
+
+    def items(self, obj):
+        return obj.posts.select_related(
+            'author', 'group'
+        )[:settings.FEED_COUNT]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def cached_feed(feed, stamp):
+    """Отдаёт ленту с условным GET и кешем до следующей записи поста.
+
+    stamp(**kwargs) возвращает имя метки версии из posts.cache,
+    которую сдвигают сигналы при изменении постов этой ленты.
+    """
+    def view(request, **kwargs):
+        etag, last_modified, not_modified = conditional_stamps(
+            request, stamp(**kwargs)
+        )
+        if not_modified is not None:
+            return not_modified
+        # Ссылки в ленте абсолютные, поэтому ключ зависит от схемы и хоста.
+        key = (
+            f'feed:{request.scheme}:{request.get_host()}:{request.path}:'
+            f'{etag}'
+        )
+        cached = cache.get(key)
+        if cached is None:
+            response = feed(request, **kwargs)
+            cache.set(
+                key,
+                (response.content, response['Content-Type']),
+                settings.FEED_CACHE_TIME,
+            )
+        else:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+        return stamp_headers(response, etag, last_modified)
+    return view
+
+
+index_rss = cached_feed(LatestPostsFeed(), index_stamp)
+index_atom = cached_feed(LatestPostsAtomFeed(), index_stamp)
+group_rss = cached_feed(GroupPostsFeed(), group_stamp)
+group_atom = cached_feed(GroupPostsAtomFeed(), group_stamp)
+profile_rss = cached_feed(AuthorPostsFeed(), author_stamp)
+profile_atom = cached_feed(AuthorPostsAtomFeed(), author_stamp)
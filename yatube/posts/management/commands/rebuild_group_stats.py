@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import GroupStats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает GroupStats для всех групп: после загрузки данных '
+        'мимо сигналов или для проверки расхождений.'
+    )
+
+    def handle(self, *args, **options):
+        stats = GroupStats.objects.rebuild_all()
+        self.stdout.write(f'Пересчитано групп: {len(stats)}')
@@ -0,0 +1,224 @@
+import os
+import random
+import time
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from faker import Faker
+
+from posts.models import Comment, Follow, Group, GroupStats, Post, User
+
+SENTENCE_POOL: int = 5000
+IMAGE_POOL: int = 20
+IMAGE_SIZE = (960, 540)
+TEXT_LENGTH_MU: float = 5.5
+TEXT_LENGTH_SIGMA: float = 0.9
+MIN_TEXT_LENGTH: int = 10
+MAX_TEXT_LENGTH: int = 5000
+GROUP_SHARE: float = 0.7
+PARETO_ALPHA: float = 1.2
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочных тестов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Среднее число подписок пользователя.'
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.0,
+            help='Доля постов с картинкой, от 0 до 1.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        self.sentences = [
+            self.fake.sentence() for _ in range(SENTENCE_POOL)
+        ]
+        started = time.monotonic()
+        with transaction.atomic():
+            users = self.stage('users', self.create_users, options['users'])
+            groups = self.stage(
+                'groups', self.create_groups, options['groups']
+            )
+            posts = self.stage(
+                'posts', self.create_posts,
+                options['posts'], users, groups, options['images']
+            )
+            self.stage(
+                'comments', self.create_comments,
+                options['comments'], users, posts
+            )
+            self.stage(
+                'follows', self.create_follows, users, options['follows']
+            )
+            self.stage('group stats', GroupStats.objects.rebuild_all)
+        # bulk_create обходит сигналы: метки версий, наборы подписок и
+        # закешированные объекты устарели разом.
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            'Готово за {:.1f} с'.format(time.monotonic() - started)
+        ))
+
+    def stage(self, name, func, *args):
+        started = time.monotonic()
+        result = func(*args)
+        self.stdout.write('{}: {} за {:.1f} с'.format(
+            name, len(result), time.monotonic() - started
+        ))
+        return result
+
+    def bulk_create(self, model, objects):
+        """Создаёт объекты пачками и возвращает id новых строк."""
+        before = model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch)
+                batch = []
+        model.objects.bulk_create(batch)
+        return list(model.objects.filter(pk__gt=before).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+
+    def power_law_weights(self, count):
+        """Накопленные веса с тяжёлым хвостом: немногие объекты популярны."""
+        return list(accumulate(
+            self.rng.paretovariate(PARETO_ALPHA) for _ in range(count)
+        ))
+
+    def text(self):
+        length = int(self.rng.lognormvariate(
+            TEXT_LENGTH_MU, TEXT_LENGTH_SIGMA
+        ))
+        length = max(MIN_TEXT_LENGTH, min(length, MAX_TEXT_LENGTH))
+        parts = []
+        size = 0
+        while size < length:
+            sentence = self.rng.choice(self.sentences)
+            parts.append(sentence)
+            size += len(sentence) + 1
+        return ' '.join(parts)[:length]
+
+    def create_users(self, count):
+        password = make_password(None)
+        suffix = self.rng.getrandbits(32)
+        return self.bulk_create(User, (
+            User(
+                username=f'{self.fake.user_name()}_{suffix:x}_{i}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password=password,
+            )
+            for i in range(count)
+        ))
+
+    def create_groups(self, count):
+        suffix = self.rng.getrandbits(32)
+        return self.bulk_create(Group, (
+            Group(
+                title=self.fake.sentence(nb_words=3)[:200],
+                slug=f'group-{suffix:x}-{i}',
+                description=self.text(),
+            )
+            for i in range(count)
+        ))
+
+    def create_images(self):
+        """Рисует небольшой набор картинок, которые делят между постами."""
+        from PIL import Image
+
+        directory = os.path.join(settings.MEDIA_ROOT, 'posts')
+        os.makedirs(directory, exist_ok=True)
+        names = []
+        for i in range(IMAGE_POOL):
+            name = f'posts/seed_{i}.jpg'
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            Image.new('RGB', IMAGE_SIZE, color).save(
+                os.path.join(settings.MEDIA_ROOT, name)
+            )
+            names.append(name)
+        return names
+
+    def create_posts(self, count, users, groups, images_share):
+        images = self.create_images() if images_share else []
+        weights = self.power_law_weights(len(users))
+
+        def posts():
+            for _ in range(count):
+                author_id = self.rng.choices(users, cum_weights=weights)[0]
+                group_id = None
+                if groups and self.rng.random() < GROUP_SHARE:
+                    group_id = self.rng.choice(groups)
+                image = ''
+                if images and self.rng.random() < images_share:
+                    image = self.rng.choice(images)
+                yield Post(
+                    text=self.text(),
+                    author_id=author_id,
+                    group_id=group_id,
+                    image=image,
+                )
+        return self.bulk_create(Post, posts())
+
+    def create_comments(self, count, users, posts):
+        if not posts:
+            return []
+        weights = self.power_law_weights(len(posts))
+        return self.bulk_create(Comment, (
+            Comment(
+                post_id=self.rng.choices(posts, cum_weights=weights)[0],
+                author_id=self.rng.choice(users),
+                text=self.text()[:self.rng.randint(MIN_TEXT_LENGTH, 500)],
+            )
+            for _ in range(count)
+        ))
+
+    def create_follows(self, users, mean_follows):
+        """Граф подписок: число подписок и популярность авторов
+        распределены по степенному закону."""
+        if len(users) < 2 or not mean_follows:
+            return []
+        weights = self.power_law_weights(len(users))
+        # Среднее распределения Парето равно alpha / (alpha - 1).
+        scale = mean_follows * (PARETO_ALPHA - 1) / PARETO_ALPHA
+
+        def follows():
+            for user_id in users:
+                wanted = min(
+                    int(scale * self.rng.paretovariate(PARETO_ALPHA)),
+                    len(users) - 1,
+                )
+                authors = set()
+                for _ in range(wanted * 2):
+                    if len(authors) >= wanted:
+                        break
+                    author_id = self.rng.choices(
+                        users, cum_weights=weights
+                    )[0]
+                    if author_id != user_id:
+                        authors.add(author_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+        return self.bulk_create(Follow, follows())
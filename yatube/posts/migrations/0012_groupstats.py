@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+LATEST_POSTS = 3
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    Post = apps.get_model('posts', 'Post')
+    stats = []
+    for group in Group.objects.annotate(
+        post_count=models.Count('posts'),
+        last_post_date=models.Max('posts__pub_date'),
+    ).iterator():
+        latest = Post.objects.filter(group_id=group.pk).order_by(
+            '-pub_date', '-pk'
+        ).values_list('pk', flat=True)[:LATEST_POSTS]
+        stats.append(GroupStats(
+            group_id=group.pk,
+            post_count=group.post_count,
+            last_post_date=group.last_post_date,
+            latest_post_ids=','.join(str(pk) for pk in latest),
+        ))
+    GroupStats.objects.bulk_create(stats, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_auto_20221125_2251'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group', verbose_name='Группа')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('last_post_date', models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего поста')),
+                ('latest_post_ids', models.CharField(blank=True, max_length=100, verbose_name='id последних постов')),
+            ],
+            options={
+                'verbose_name': 'Статистика группы',
+                'verbose_name_plural': 'Статистика групп',
+                'ordering': ('-last_post_date', '-group'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='groupstats',
+            index=models.Index(fields=['-last_post_date', '-group'], name='groupstats_last_post_idx'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
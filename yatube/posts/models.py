@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F
 
 User = get_user_model()
 
@@ -71,6 +72,132 @@ class Group(models.Model):
         return self.title
 
 
+class GroupStatsQuerySet(models.QuerySet):
+    def latest_posts(self, group_id):
+        """(pk, pub_date) последних постов группы, новые первыми."""
+        return list(
+            Post.objects.filter(group_id=group_id)
+            .order_by('-pub_date', '-pk')
+            .values_list('pk', 'pub_date')[:GroupStats.LATEST_POSTS]
+        )
+
+    def set_latest(self, group_id, latest):
+        self.filter(pk=group_id).update(
+            last_post_date=latest[0][1] if latest else None,
+            latest_post_ids=','.join(str(pk) for pk, _ in latest),
+        )
+
+    @transaction.atomic
+    def add_post(self, post):
+        """Учитывает пост, появившийся в группе post.group_id. Строка
+        блокируется до конца транзакции, чтобы параллельные посты в ту же
+        группу не затёрли друг другу latest_post_ids."""
+        stats, _ = self.select_for_update().get_or_create(
+            group_id=post.group_id
+        )
+        self.filter(pk=post.group_id).update(post_count=F('post_count') + 1)
+        if (stats.last_post_date is None
+                or post.pub_date >= stats.last_post_date):
+            latest = [(post.pk, post.pub_date)] + [
+                (pk, None) for pk in stats.latest_ids if pk != post.pk
+            ]
+            self.filter(pk=post.group_id).update(
+                last_post_date=post.pub_date,
+                latest_post_ids=','.join(
+                    str(pk) for pk, _ in latest[:GroupStats.LATEST_POSTS]
+                ),
+            )
+        else:
+            self.set_latest(post.group_id, self.latest_posts(post.group_id))
+
+    @transaction.atomic
+    def remove_post(self, group_id, post_id):
+        """Учитывает пост, ушедший из группы или удалённый."""
+        stats = self.select_for_update().filter(pk=group_id).first()
+        if stats is None:
+            return
+        self.filter(pk=group_id, post_count__gt=0).update(
+            post_count=F('post_count') - 1
+        )
+        if post_id in stats.latest_ids:
+            self.set_latest(group_id, self.latest_posts(group_id))
+
+    def refresh(self, group_id):
+        """Пересчитывает агрегаты группы с нуля."""
+        self.update_or_create(group_id=group_id, defaults={
+            'post_count': Post.objects.filter(group_id=group_id).count(),
+        })
+        self.set_latest(group_id, self.latest_posts(group_id))
+
+    @transaction.atomic
+    def rebuild_all(self):
+        """Пересчитывает агрегаты всех групп: после массовой загрузки
+        через bulk_create, которая обходит сигналы."""
+        stats = []
+        for group in Group.objects.annotate(
+            posts_total=Count('posts')
+        ).iterator():
+            latest = self.latest_posts(group.pk)
+            stats.append(GroupStats(
+                group=group,
+                post_count=group.posts_total,
+                last_post_date=latest[0][1] if latest else None,
+                latest_post_ids=','.join(str(pk) for pk, _ in latest),
+            ))
+        self.all().delete()
+        return self.bulk_create(stats, batch_size=500)
+
+
+class GroupStats(models.Model):
+    """Агрегаты группы для каталога групп.
+
+    Обновляются обработчиками сигналов постов без пересчёта по всей
+    группе, поэтому каталог читается одним запросом по индексу.
+    """
+    LATEST_POSTS: int = 3
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Группа',
+    )
+    post_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов',
+    )
+    last_post_date = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата последнего поста',
+    )
+    latest_post_ids = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='id последних постов',
+    )
+
+    objects = GroupStatsQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-last_post_date', '-group')
+        indexes = [
+            models.Index(
+                fields=['-last_post_date', '-group'],
+                name='groupstats_last_post_idx',
+            ),
+        ]
+        verbose_name = 'Статистика группы'
+        verbose_name_plural = 'Статистика групп'
+
+    def __str__(self):
+        return str(self.group_id)
+
+    @property
+    def latest_ids(self):
+        return [int(pk) for pk in self.latest_post_ids.split(',') if pk]
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
@@ -94,6 +221,14 @@ class Comment(models.Model):
         return self.text
 
 
+class FollowQuerySet(models.QuerySet):
+    def author_ids(self, user_id):
+        """id авторов, на которых подписан пользователь, по возрастанию."""
+        return self.filter(user_id=user_id).order_by(
+            'author_id'
+        ).values_list('author_id', flat=True)
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE,
@@ -107,6 +242,8 @@ class Follow(models.Model):
         verbose_name='Автор публикации',
     )
 
+    objects = FollowQuerySet.as_manager()
+
     class Meta:
         ordering = ('-author',)
         verbose_name = 'Подписки автора'
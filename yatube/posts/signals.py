@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.cache import bump_stamps
+
+from .cache import (author_stamp, cached_groups, cached_posts, cached_users,
+                    group_stamp, index_stamp, refresh_follow_set)
+from .models import Follow, Group, GroupStats, Post, User
+
+
+def post_stamps(post):
+    """Метки лент, в которых показывается пост."""
+    stamps = [index_stamp(), author_stamp(post.author.username)]
+    if post.group_id:
+        stamps.append(group_stamp(post.group.slug))
+    return stamps
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_group(sender, instance, **kwargs):
+    """Запоминает прежнюю группу (id, slug), чтобы обновить и её ленту
+    и агрегаты; у нового поста её нет."""
+    instance._old_group = (None, None)
+    if instance.pk is not None:
+        instance._old_group = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'group__slug')
+            .first()
+        ) or (None, None)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, **kwargs):
+    stamps = post_stamps(instance)
+    old_group_id, old_group_slug = getattr(
+        instance, '_old_group', (instance.group_id, None)
+    )
+    if old_group_id != instance.group_id:
+        if old_group_id:
+            stamps.append(group_stamp(old_group_slug))
+            GroupStats.objects.remove_post(old_group_id, instance.pk)
+        if instance.group_id:
+            GroupStats.objects.add_post(instance)
+    bump_stamps(*stamps)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump_stamps(*post_stamps(instance))
+    if instance.group_id:
+        GroupStats.objects.remove_post(instance.group_id, instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    bump_stamps(index_stamp(), group_stamp(instance.slug))
+
+
+@receiver(post_save, sender=Group)
+def group_created(sender, instance, created, raw=False, **kwargs):
+    """Новая группа сразу попадает в каталог."""
+    if created and not raw:
+        GroupStats.objects.get_or_create(group=instance)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    """Перестраивает набор подписок после фиксации транзакции."""
+    transaction.on_commit(lambda: refresh_follow_set(instance.user_id))
+
+
+for objects, model in (
+    (cached_users, User), (cached_groups, Group), (cached_posts, Post)
+):
+    for signal in (post_save, post_delete):
+        signal.connect(
+            objects.invalidate, sender=model,
+            dispatch_uid=f'object_cache:{objects.label}',
+        )
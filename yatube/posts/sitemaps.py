@@ -0,0 +1,212 @@
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+
+from core.cache import conditional_stamps, stamp_headers
+
+from .cache import index_stamp
+from .models import Group, Post, User
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_OPEN = (
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+URLSET_CLOSE = '</urlset>\n'
+SITEMAPINDEX_OPEN = (
+    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+SITEMAPINDEX_CLOSE = '</sitemapindex>\n'
+CONTENT_TYPE = 'application/xml'
+
+
+class Section:
+    """Раздел карты сайта, разбитый на шарды по диапазонам первичного ключа.
+
+    Шард n содержит объекты с pk в (n * size, (n + 1) * size], поэтому
+    выборка шарда идёт по индексу без OFFSET и в нём не больше size адресов.
+    Кеш шарда привязан к version(): новые записи в других диапазонах его
+    не сбрасывают.
+    """
+    url_name = None
+    model = None
+    lastmod_field = 'posts__pub_date'
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def url_args(self, row):
+        raise NotImplementedError
+
+    def shard_count(self):
+        # По таблице модели, без аннотаций get_queryset(): иначе для групп
+        # и профилей это JOIN со всеми постами.
+        max_pk = self.model.objects.aggregate(max_pk=Max('pk'))['max_pk']
+        return (max_pk or 0) // settings.SITEMAP_SHARD_SIZE + 1
+
+    def shard_range(self, queryset, shard):
+        size = settings.SITEMAP_SHARD_SIZE
+        return queryset.filter(pk__gt=shard * size, pk__lte=(shard + 1) * size)
+
+    def rows(self, shard):
+        return self.shard_range(self.get_queryset(), shard).order_by(
+            'pk'
+        ).iterator(chunk_size=settings.SITEMAP_CHUNK_SIZE)
+
+    def version(self, shard):
+        """Версия диапазона шарда и число строк в нём одним запросом.
+
+        Версия складывается из числа строк, наибольшего pk и lastmod.
+        Переименование без новых постов её не меняет: такой шард
+        обновится по истечении SITEMAP_CACHE_TIME.
+        """
+        version = self.shard_range(self.model.objects, shard).aggregate(
+            rows=Count('pk', distinct=True),
+            max_pk=Max('pk'),
+            lastmod=Max(self.lastmod_field),
+        )
+        lastmod = version['lastmod']
+        return '{}-{}-{}'.format(
+            version['rows'],
+            version['max_pk'] or 0,
+            int(lastmod.timestamp()) if lastmod else 0,
+        ), version['rows']
+
+    def location(self, row):
+        return reverse(self.url_name, args=self.url_args(row))
+
+
+class PostSection(Section):
+    url_name = 'posts:post_detail'
+    model = Post
+    lastmod_field = 'pub_date'
+
+    def get_queryset(self):
+        return Post.objects.values_list('pk', 'pub_date')
+
+    def url_args(self, row):
+        return (row[0],)
+
+
+class GroupSection(Section):
+    url_name = 'posts:group_list'
+    model = Group
+
+    def get_queryset(self):
+        return Group.objects.annotate(
+            lastmod=Max('posts__pub_date')
+        ).values_list('slug', 'lastmod')
+
+    def url_args(self, row):
+        return (row[0],)
+
+
+class ProfileSection(Section):
+    url_name = 'posts:profile'
+    model = User
+
+    def get_queryset(self):
+        return User.objects.annotate(
+            lastmod=Max('posts__pub_date')
+        ).filter(lastmod__isnull=False).values_list('username', 'lastmod')
+
+    def url_args(self, row):
+        return (row[0],)
+
+
+SECTIONS = {
+    'posts': PostSection(),
+    'groups': GroupSection(),
+    'profiles': ProfileSection(),
+}
+
+
+def url_entry(root, location, lastmod):
+    entry = f'<url><loc>{escape(root + location)}</loc>'
+    if lastmod is not None:
+        entry += f'<lastmod>{lastmod.date().isoformat()}</lastmod>'
+    return entry + '</url>\n'
+
+
+def shard_chunks(request, section, shard):
+    """Построчно отдаёт XML шарда пачками по SITEMAP_CHUNK_SIZE адресов."""
+    yield XML_HEADER + URLSET_OPEN
+    root = request.build_absolute_uri('/').rstrip('/')
+    chunk = []
+    for row in section.rows(shard):
+        chunk.append(url_entry(root, section.location(row), row[-1]))
+        if len(chunk) >= settings.SITEMAP_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    yield ''.join(chunk) + URLSET_CLOSE
+
+
+def caching_stream(chunks, key):
+    """Пропускает поток дальше и кладёт его в кеш, когда он дочитан."""
+    parts = []
+    for part in chunks:
+        parts.append(part)
+        yield part
+    cache.set(key, ''.join(parts), settings.SITEMAP_CACHE_TIME)
+
+
+def sitemap_index(request):
+    etag, last_modified, not_modified = conditional_stamps(
+        request, index_stamp()
+    )
+    if not_modified is not None:
+        return not_modified
+    key = f'sitemap:index:{request.scheme}:{request.get_host()}:{etag}'
+    content = cache.get(key)
+    if content is None:
+        entries = []
+        for name, section in SECTIONS.items():
+            for shard in range(section.shard_count()):
+                location = request.build_absolute_uri(reverse(
+                    'posts:sitemap_shard', args=(name, shard)
+                ))
+                entries.append(
+                    f'<sitemap><loc>{escape(location)}</loc></sitemap>\n'
+                )
+        content = (
+            XML_HEADER + SITEMAPINDEX_OPEN
+            + ''.join(entries) + SITEMAPINDEX_CLOSE
+        )
+        cache.set(key, content, settings.SITEMAP_CACHE_TIME)
+    return stamp_headers(
+        HttpResponse(content, content_type=CONTENT_TYPE),
+        etag, last_modified
+    )
+
+
+def sitemap_shard(request, section, shard):
+    if section not in SECTIONS:
+        raise Http404('Раздел карты сайта не найден.')
+    etag, last_modified, not_modified = conditional_stamps(
+        request, index_stamp()
+    )
+    if not_modified is not None:
+        return not_modified
+    host = f'{request.scheme}:{request.get_host()}'
+    pointer = f'sitemap:{section}:{shard}:{host}:{etag}'
+    key = cache.get(pointer)
+    if key is None:
+        version, rows = SECTIONS[section].version(shard)
+        if not rows and shard >= SECTIONS[section].shard_count():
+            raise Http404('Шард карты сайта не найден.')
+        key = f'sitemap:{section}:{shard}:{host}:v{version}'
+        cache.set(pointer, key, settings.SITEMAP_CACHE_TIME)
+    content = cache.get(key)
+    if content is not None:
+        response = HttpResponse(content, content_type=CONTENT_TYPE)
+    else:
+        response = StreamingHttpResponse(
+            caching_stream(
+                shard_chunks(request, SECTIONS[section], shard), key
+            ),
+            content_type=CONTENT_TYPE,
+        )
+    return stamp_headers(response, etag, last_modified)
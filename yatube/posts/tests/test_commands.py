@@ -0,0 +1,61 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from core.cache import STAMP_KEY
+from posts.cache import index_stamp
+from posts.models import Comment, Follow, Group, GroupStats, Post, User
+
+
+class SeedScaleCommandTests(TestCase):
+    def seed(self, seed):
+        call_command(
+            'seed_scale', users=20, groups=3, posts=50, comments=30,
+            follows=3, seed=seed, stdout=StringIO(),
+        )
+
+    def test_seed_clears_cache(self):
+        """После загрузки мимо сигналов кеш не отдаёт устаревшее."""
+        key = STAMP_KEY.format(index_stamp())
+        cache.set(key, 1)
+        self.seed(1)
+        self.assertIsNone(cache.get(key))
+
+    def test_seed_creates_dataset(self):
+        """Команда создаёт заданное число объектов."""
+        self.seed(1)
+        expected = [
+            (User, 20),
+            (Group, 3),
+            (Post, 50),
+            (Comment, 30),
+        ]
+        for model, count in expected:
+            with self.subTest(model=model.__name__):
+                self.assertEqual(model.objects.count(), count)
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists()
+        )
+        self.assertEqual(
+            sum(GroupStats.objects.values_list('post_count', flat=True)),
+            Post.objects.filter(group__isnull=False).count(),
+        )
+        self.assertEqual(GroupStats.objects.count(), 3)
+
+    def test_seed_is_reproducible(self):
+        """Одинаковый seed даёт одинаковые тексты постов."""
+        self.seed(7)
+        first = list(Post.objects.order_by('pk').values_list(
+            'text', flat=True
+        ))
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.seed(7)
+        second = list(Post.objects.order_by('pk').values_list(
+            'text', flat=True
+        ))
+        self.assertEqual(first, second)
@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='feeder')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='feed-slug',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый пост для ленты',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feeds_contain_posts(self):
+        """Ленты RSS и Atom содержат пост."""
+        urls = [
+            reverse('posts:index_rss'),
+            reverse('posts:index_atom'),
+            reverse('posts:group_rss', args=(self.group.slug,)),
+            reverse('posts:group_atom', args=(self.group.slug,)),
+            reverse('posts:profile_rss', args=(self.user.username,)),
+            reverse('posts:profile_atom', args=(self.user.username,)),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn(self.post.text, response.content.decode())
+                self.assertTrue(response.has_header('ETag'))
+
+    def test_unknown_group_feed_not_found(self):
+        """Лента несуществующей группы отдаёт 404."""
+        response = self.guest_client.get(
+            reverse('posts:group_rss', args=('no-such-group',))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_feed_conditional_get(self):
+        """Лента отдаёт 304, пока не появится новый пост."""
+        url = reverse('posts:group_rss', args=(self.group.slug,))
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(
+            author=self.user, group=self.group, text='Новый пост'
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('Новый пост', response.content.decode())
+
+    def test_feed_cached_until_post_written(self):
+        """Лента берётся из кеша без запросов к базе."""
+        url = reverse('posts:index_atom')
+        first = self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url)
+        self.assertEqual(first.content, second.content)
+
+    def test_feed_cached_per_host(self):
+        """Ссылки в ленте из кеша строятся от хоста и схемы запроса."""
+        url = reverse('posts:index_rss')
+        self.guest_client.get(url, HTTP_HOST='localhost')
+        for host, secure in (('127.0.0.1', False), ('localhost', True)):
+            with self.subTest(host=host, secure=secure):
+                response = self.guest_client.get(
+                    url, HTTP_HOST=host, secure=secure
+                )
+                scheme = 'https' if secure else 'http'
+                self.assertIn(
+                    f'{scheme}://{host}/', response.content.decode()
+                )
+                self.assertNotIn(
+                    'http://localhost/', response.content.decode()
+                )
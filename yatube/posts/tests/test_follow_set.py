@@ -0,0 +1,103 @@
+from array import array
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.cache import (FOLLOWS_KEY, follow_set, is_following,
+                         refresh_follow_set)
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowSetTests(TransactionTestCase):
+    """Вне транзакции: набор подписок кешируется после фиксации."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader')
+        self.authors = [
+            User.objects.create_user(username=f'writer_{i}')
+            for i in range(3)
+        ]
+        for author in self.authors:
+            Post.objects.create(author=author, text='Тестовый пост')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_sorted_array(self):
+        """Набор — отсортированный массив id, поиск по нему бинарный."""
+        for author in reversed(self.authors[1:]):
+            Follow.objects.create(user=self.user, author=author)
+        ids = follow_set(self.user)
+        self.assertEqual(
+            ids, array('I', sorted(a.pk for a in self.authors[1:]))
+        )
+        self.assertTrue(is_following(ids, self.authors[1].pk))
+        self.assertFalse(is_following(ids, self.authors[0].pk))
+
+    def test_updated_on_follow_and_unfollow(self):
+        """Подписка и отписка сразу меняют закешированный набор."""
+        author = self.authors[0]
+        self.client.get(
+            reverse('posts:profile_follow', args=(author.username,))
+        )
+        self.assertTrue(is_following(follow_set(self.user), author.pk))
+        self.client.get(
+            reverse('posts:profile_unfollow', args=(author.username,))
+        )
+        self.assertFalse(is_following(follow_set(self.user), author.pk))
+
+    def test_index_fragment_shared_and_current(self):
+        """Фрагмент index общий для читателей, а ссылка подписки в нём
+        меняется сразу после подписки."""
+        author = self.authors[0]
+        unfollow = reverse('posts:profile_unfollow', args=(author.username,))
+        other = Client()
+        other.force_login(self.authors[1])
+        other.get(reverse('posts:index'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, unfollow)
+        self.client.get(
+            reverse('posts:profile_follow', args=(author.username,))
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, unfollow)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'posts_post' in query['sql'] and 'COUNT' not in query['sql']
+        ])
+
+    def test_read_miss_keeps_newer_set(self):
+        """Чтение при промахе не затирает набор, записанный сигналом."""
+        key = FOLLOWS_KEY.format(self.user.pk)
+        cache.set(key, array('I', [self.authors[0].pk]))
+        refresh_follow_set(self.user.pk, replace=False)
+        self.assertEqual(cache.get(key), array('I', [self.authors[0].pk]))
+        refresh_follow_set(self.user.pk)
+        self.assertEqual(cache.get(key), array('I'))
+
+    def test_views_skip_follow_table(self):
+        """С прогретым набором страницы не обращаются к Follow."""
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        urls = (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', args=(self.authors[0].username,)),
+            reverse('posts:follow_status') + f'?authors={self.authors[0].pk}',
+        )
+        for url in urls:
+            self.client.get(url)
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertFalse([
+                    query for query in queries.captured_queries
+                    if 'posts_follow' in query['sql']
+                ])
+        self.assertEqual(len(response.json()['following']), 1)
@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Group, GroupStats, Post
+
+User = get_user_model()
+
+
+class GroupStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание',
+        )
+        cls.other = Group.objects.create(
+            title='Другая группа', slug='other-slug', description='Описание',
+        )
+
+    def stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def test_created_with_group(self):
+        """Новая группа попадает в каталог с пустыми агрегатами."""
+        stats = self.stats(self.group)
+        self.assertEqual(stats.post_count, 0)
+        self.assertIsNone(stats.last_post_date)
+        self.assertEqual(stats.latest_ids, [])
+
+    def test_posts_counted_incrementally(self):
+        """Новые посты увеличивают счётчик и встают в начало последних."""
+        posts = [
+            Post.objects.create(
+                author=self.user, group=self.group, text=f'Пост {i}'
+            )
+            for i in range(GroupStats.LATEST_POSTS + 1)
+        ]
+        stats = self.stats(self.group)
+        self.assertEqual(stats.post_count, len(posts))
+        self.assertEqual(stats.last_post_date, posts[-1].pub_date)
+        self.assertEqual(
+            stats.latest_ids,
+            [post.pk for post in reversed(posts)][:GroupStats.LATEST_POSTS],
+        )
+
+    def test_post_moved_and_deleted(self):
+        """Перенос поста и удаление обновляют агрегаты обеих групп."""
+        old = Post.objects.create(
+            author=self.user, group=self.group, text='Старый пост'
+        )
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=1)
+        )
+        new = Post.objects.create(
+            author=self.user, group=self.other, text='Новый пост'
+        )
+        old.refresh_from_db()
+        old.group = self.other
+        old.save()
+        self.assertEqual(self.stats(self.group).post_count, 0)
+        self.assertEqual(self.stats(self.group).latest_ids, [])
+        stats = self.stats(self.other)
+        self.assertEqual(stats.post_count, 2)
+        self.assertEqual(stats.latest_ids, [new.pk, old.pk])
+        new.delete()
+        stats = self.stats(self.other)
+        self.assertEqual(stats.post_count, 1)
+        self.assertEqual(stats.latest_ids, [old.pk])
+        self.assertEqual(stats.last_post_date, old.pub_date)
+
+    def test_refresh_matches_incremental(self):
+        """Пересчёт с нуля даёт те же агрегаты."""
+        for i in range(5):
+            Post.objects.create(
+                author=self.user, group=self.group, text=f'Пост {i}'
+            )
+        incremental = self.stats(self.group)
+        GroupStats.objects.refresh(self.group.pk)
+        refreshed = self.stats(self.group)
+        for field in ('post_count', 'last_post_date', 'latest_post_ids'):
+            self.assertEqual(
+                getattr(refreshed, field), getattr(incremental, field)
+            )
+
+    def test_rebuild_all(self):
+        """Пересчёт восстанавливает агрегаты постов, созданных мимо
+        сигналов."""
+        Post.objects.bulk_create([
+            Post(author=self.user, group=self.group, text=f'Пост {i}')
+            for i in range(2)
+        ])
+        GroupStats.objects.rebuild_all()
+        self.assertEqual(self.stats(self.group).post_count, 2)
+        self.assertEqual(len(self.stats(self.group).latest_ids), 2)
+        self.assertEqual(self.stats(self.other).post_count, 0)
+
+    def test_group_index(self):
+        """Каталог показывает группы с последним постом первыми."""
+        post = Post.objects.create(
+            author=self.user, group=self.other, text='Пост в другой группе'
+        )
+        response = self.client.get(reverse('posts:group_index'))
+        self.assertTemplateUsed(response, 'posts/group_index.html')
+        page = list(response.context['page_obj'])
+        self.assertEqual(
+            [stats.group for stats in page], [self.other, self.group]
+        )
+        self.assertEqual(page[0].latest_posts, [post])
+        self.assertContains(
+            response, reverse('posts:post_detail', args=(post.pk,))
+        )
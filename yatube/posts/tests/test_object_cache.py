@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.test import TestCase, TransactionTestCase
+
+from posts.cache import cached_groups, cached_posts, cached_users
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ObjectCacheTests(TransactionTestCase):
+    """Вне транзакции: внутри неё кеш заполняется только после фиксации."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='cached-slug',
+        )
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text='Тестовый пост'
+        )
+
+    def test_hit_without_queries(self):
+        """Повторный поиск по pk и естественному ключу не ходит в базу."""
+        cached_posts.get(pk=self.post.pk)
+        cached_users.get(username=self.user.username)
+        cached_groups.get(slug=self.group.slug)
+        with self.assertNumQueries(0):
+            post = cached_posts.get(pk=self.post.pk)
+            self.assertEqual(post.author.username, self.user.username)
+            self.assertEqual(post.group.slug, self.group.slug)
+            self.assertEqual(
+                cached_users.get(username=self.user.username), self.user
+            )
+            self.assertEqual(
+                cached_groups.get(slug=self.group.slug), self.group
+            )
+
+    def test_related_loaded_together(self):
+        """Промах по посту — один запрос, автор и группа кешируются с ним."""
+        with self.assertNumQueries(1):
+            cached_posts.get(pk=self.post.pk)
+        with self.assertNumQueries(0):
+            cached_users.get(pk=self.user.pk)
+            cached_groups.get(pk=self.group.pk)
+
+    def test_user_secrets_not_cached(self):
+        """Хеш пароля и почта пользователя не попадают в кеш, а при
+        обращении догружаются из базы."""
+        user = User.objects.create_user(
+            username='secret', email='secret@example.com', password='pass'
+        )
+        cached_users.get(pk=user.pk)
+        entry = cache.get(cached_users.key('pk', user.pk))
+        self.assertEqual(entry.username, 'secret')
+        self.assertTrue(
+            {'password', 'email'} <= entry.get_deferred_fields()
+        )
+        self.assertEqual(entry.email, 'secret@example.com')
+
+    def test_invalidated_on_save(self):
+        """Изменение автора видно в посте, изменение поста — сразу."""
+        cached_posts.get(pk=self.post.pk)
+        self.user.first_name = 'Имя'
+        self.user.save()
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигнала')
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        post = cached_posts.get(pk=self.post.pk)
+        self.assertEqual(post.text, 'Новый текст')
+        self.assertEqual(post.author.first_name, 'Имя')
+
+    def test_renamed_natural_key(self):
+        """Старый slug после переименования не находит группу."""
+        cached_groups.get(slug=self.group.slug)
+        self.group.slug = 'renamed-slug'
+        self.group.save()
+        with self.assertRaises(Http404):
+            get_object_or_404(cached_groups, slug='cached-slug')
+        self.assertEqual(
+            cached_groups.get(slug='renamed-slug').pk, self.group.pk
+        )
+
+    def test_in_bulk(self):
+        """in_bulk добирает промахи одним запросом."""
+        other = User.objects.create_user(username='other')
+        cached_users.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            found = cached_users.in_bulk([self.user.pk, other.pk, 0])
+        self.assertEqual(set(found), {self.user.pk, other.pk})
+
+
+class ObjectCacheTransactionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_not_cached_before_commit(self):
+        """Объект, прочитанный в незафиксированной транзакции, не кешируется.
+        """
+        user = User.objects.create_user(username='uncommitted')
+        cached_users.get(pk=user.pk)
+        self.assertIsNone(cache.get(cached_users.key('pk', user.pk)))
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase
+
+from core.templatetags.post_cards import card_key
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+CARDS = Template(
+    '{% load post_cards %}'
+    '{% post_cards posts index_link=True follow_link=True as cards %}'
+    '{% follow_buttons %}'
+    '{% for card in cards %}{{ card }}{% endfor %}'
+    '{% endfollow_buttons %}'
+)
+
+
+class PostCardsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='carder')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='cards-slug',
+        )
+        for i in range(3):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def posts(self):
+        return list(Post.objects.select_related('author', 'group'))
+
+    def render(self, posts, user):
+        return CARDS.render(Context({'posts': posts, 'user': user}))
+
+    def test_cards_cached(self):
+        """Карточки рендерятся один раз и дальше берутся из кеша."""
+        posts = self.posts()
+        html = self.render(posts, self.reader)
+        for post in posts:
+            self.assertIn(post.text, html)
+            key = card_key(post, {'follow_link': True, 'index_link': True})
+            self.assertIn(post.text, cache.get(key))
+        cache.set(key, 'из кеша')
+        self.assertIn('из кеша', self.render(posts, self.reader))
+
+    def test_key_changes_with_author_name(self):
+        """Смена имени автора даёт новый ключ карточки."""
+        post = self.posts()[0]
+        before = card_key(post, {})
+        post.author.first_name = 'Имя'
+        self.assertNotEqual(card_key(post, {}), before)
+
+    def test_follow_link_per_reader(self):
+        """Ссылка подписки зависит от читателя, а не от закешированной
+        карточки."""
+        posts = self.posts()[:1]
+        self.assertIn('подписаться', self.render(posts, self.reader))
+        Follow.objects.create(user=self.reader, author=self.author)
+        cache.clear()
+        self.assertIn('отписаться', self.render(posts, self.reader))
+        for user in (self.author, AnonymousUser()):
+            with self.subTest(user=user):
+                html = self.render(posts, user)
+                self.assertNotIn('подписаться', html)
+                self.assertNotIn('<!--follow', html)
@@ -0,0 +1,216 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from sorl.thumbnail import get_thumbnail
+
+from core.templatetags.post_cards import CARD_THUMBNAIL
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+NAMESPACES = ('posts', 'auth', 'about')
+# Бюджет запросов к базе на один просмотр без кеша у авторизованного
+# пользователя. Он не должен зависеть от числа постов на странице.
+# Набор подписок без кеша стоит один запрос, с кешем — ни одного;
+# записи миниатюр страницы читаются из kvstore одним запросом.
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:group_index': 4,
+    'posts:group_list': 6,
+    'posts:profile': 6,
+    'posts:post_detail': 6,
+    'posts:post_create': 3,
+    'posts:post_edit': 4,
+    'posts:add_comment': 3,
+    'posts:follow_index': 6,
+    'posts:follow_status': 3,
+    'posts:new_posts': 2,
+    'posts:index_fragment': 4,
+    'posts:group_fragment': 5,
+    'posts:profile_fragment': 5,
+    'posts:follow_fragment': 5,
+    'posts:profile_follow': 4,
+    'posts:profile_unfollow': 4,
+    'posts:index_rss': 1,
+    'posts:index_atom': 1,
+    'posts:group_rss': 2,
+    'posts:group_atom': 2,
+    'posts:profile_rss': 2,
+    'posts:profile_atom': 2,
+    'posts:sitemap': 3,
+    'posts:sitemap_shard': 2,
+    'auth:signup': 2,
+    'auth:logout': 4,
+    'auth:login': 2,
+    'about:author': 2,
+    'about:tech': 2,
+}
+PAGE_SIZES = (3, 10)
+ADMIN_BUDGETS = {
+    'admin:posts_post_changelist': 7,
+    'admin:posts_comment_changelist': 6,
+    'admin:posts_follow_changelist': 6,
+}
+
+
+def named_urls():
+    """Маршруты из NAMESPACES: ('namespace:name', имена параметров)."""
+    urls = []
+    for resolver in get_resolver().url_patterns:
+        if (isinstance(resolver, URLResolver)
+                and resolver.namespace in NAMESPACES):
+            urls.extend(
+                (f'{resolver.namespace}:{pattern.name}',
+                 set(pattern.pattern.converters))
+                for pattern in resolver.url_patterns
+                if pattern.name
+            )
+    return urls
+
+
+def small_gif(name):
+    return SimpleUploadedFile(name, SMALL_GIF, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='budget')
+        authors = [
+            User.objects.create_user(username=f'author_{i}')
+            for i in range(4)
+        ]
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='budget-slug',
+        )
+        # Картинка у каждого второго поста: миниатюры страницы должны
+        # читаться из kvstore sorl-thumbnail одним запросом, а не по
+        # запросу на пост.
+        Post.objects.bulk_create(
+            Post(
+                author=authors[i % len(authors)],
+                group=cls.group,
+                text=f'Тестовый пост {i}',
+                image=small_gif(f'small_{i}.gif') if i % 2 else None,
+            )
+            for i in range(max(PAGE_SIZES) * 2)
+        )
+        cls.author = authors[0]
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Свой пост',
+            image=small_gif('own.gif'),
+        )
+        # Миниатюры создаются один раз, как в работающем приложении;
+        # замеры видят только их чтение.
+        geometry, options = CARD_THUMBNAIL
+        for post in Post.objects.exclude(image=''):
+            get_thumbnail(post.image, geometry, **options)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=author, text='Комментарий')
+            for author in authors
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.user, author=author) for author in authors
+        )
+        cls.kwargs = {
+            'slug': cls.group.slug,
+            'username': cls.author.username,
+            'post_id': cls.post.pk,
+            'section': 'posts',
+            'shard': 0,
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def count_queries(self, name, params):
+        url = reverse(name, kwargs={
+            param: self.kwargs[param] for param in params
+        })
+        cache.clear()
+        client = Client()
+        client.force_login(self.user)
+        # Каждый замер начинается с одного и того же состояния базы:
+        # иначе, например, повторная отписка удаляла бы уже нечего.
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        return queries
+
+    def test_every_url_has_budget(self):
+        """У каждого маршрута есть бюджет запросов."""
+        for name, _ in named_urls():
+            with self.subTest(name=name):
+                self.assertIn(name, QUERY_BUDGETS)
+
+    def test_query_budgets(self):
+        """Число запросов в пределах бюджета и не зависит от размера
+        страницы."""
+        for name, params in named_urls():
+            counts = set()
+            for page_size in PAGE_SIZES:
+                with self.subTest(name=name, page_size=page_size):
+                    with override_settings(COUNT=page_size):
+                        queries = self.count_queries(name, params)
+                    counts.add(len(queries))
+                    budget = QUERY_BUDGETS.get(name, 0)
+                    self.assertLessEqual(
+                        len(queries), budget,
+                        '{} сделал {} запросов при бюджете {}:\n{}'.format(
+                            name, len(queries), budget,
+                            '\n'.join(
+                                query['sql']
+                                for query in queries.captured_queries
+                            )
+                        )
+                    )
+            with self.subTest(name=name):
+                self.assertEqual(
+                    len(counts), 1,
+                    f'{name}: число запросов зависит от размера страницы'
+                )
+
+    def test_admin_changelist_budgets(self):
+        """Списки в админке не делают запросов на каждую строку."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        client = Client()
+        client.force_login(admin)
+        for name, budget in ADMIN_BUDGETS.items():
+            with self.subTest(name=name):
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(reverse(name))
+                self.assertLessEqual(
+                    len(queries), budget,
+                    '\n'.join(
+                        query['sql'] for query in queries.captured_queries
+                    )
+                )
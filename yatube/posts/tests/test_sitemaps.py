@@ -0,0 +1,121 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.cache import bump_stamps
+from posts.cache import index_stamp
+from posts.models import Group, Post
+from posts.sitemaps import SECTIONS
+
+User = get_user_model()
+
+
+class SitemapTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='mapper')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='map-slug',
+        )
+        cls.posts = Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {i}')
+            for i in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def shard_content(self, section, shard):
+        response = self.guest_client.get(
+            reverse('posts:sitemap_shard', args=(section, shard))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        if response.streaming:
+            return b''.join(response.streaming_content).decode()
+        return response.content.decode()
+
+    def test_index_lists_shards(self):
+        """Индекс карты сайта ссылается на шарды всех разделов."""
+        response = self.guest_client.get(reverse('posts:sitemap'))
+        content = response.content.decode()
+        for section in ('posts', 'groups', 'profiles'):
+            with self.subTest(section=section):
+                self.assertIn(
+                    reverse('posts:sitemap_shard', args=(section, 0)),
+                    content
+                )
+
+    def test_shards_contain_locations(self):
+        """Шарды содержат адреса постов, групп и профилей."""
+        expected = [
+            ('posts', reverse(
+                'posts:post_detail', args=(Post.objects.first().pk,)
+            )),
+            ('groups', reverse('posts:group_list', args=(self.group.slug,))),
+            ('profiles', reverse(
+                'posts:profile', args=(self.user.username,)
+            )),
+        ]
+        for section, location in expected:
+            with self.subTest(section=section):
+                self.assertIn(location, self.shard_content(section, 0))
+
+    @override_settings(SITEMAP_SHARD_SIZE=2)
+    def test_shards_split_by_primary_key(self):
+        """Посты распределяются по шардам без повторов."""
+        pks = sorted(Post.objects.values_list('pk', flat=True))
+        first_shard = pks[0] // 2
+        content = ''.join(
+            self.shard_content('posts', shard)
+            for shard in range(first_shard, pks[-1] // 2 + 1)
+        )
+        for pk in pks:
+            with self.subTest(pk=pk):
+                location = reverse('posts:post_detail', args=(pk,))
+                self.assertEqual(content.count(f'{location}<'), 1)
+
+    def test_shard_cached_after_streaming(self):
+        """Прочитанный шард кешируется и отдаётся без запросов к базе."""
+        self.shard_content('posts', 0)
+        with self.assertNumQueries(0):
+            self.shard_content('posts', 0)
+
+    @override_settings(SITEMAP_SHARD_SIZE=1)
+    def test_shard_kept_when_other_range_changes(self):
+        """Новый пост в другом диапазоне не перестраивает шард: после смены
+        метки проверяется только версия его диапазона."""
+        shard = Post.objects.earliest('pk').pk - 1
+        self.shard_content('posts', shard)
+        Post.objects.create(author=self.user, text='Новый пост')
+        bump_stamps(index_stamp())
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(
+                reverse('posts:sitemap_shard', args=('posts', shard))
+            )
+        self.assertFalse(response.streaming)
+
+    def test_shard_count_without_join(self):
+        """Число шардов считается по таблице модели, без JOIN с постами."""
+        for name, section in SECTIONS.items():
+            with self.subTest(section=name):
+                with CaptureQueriesContext(connection) as queries:
+                    section.shard_count()
+                self.assertNotIn('JOIN', queries.captured_queries[0]['sql'])
+
+    def test_unknown_section_not_found(self):
+        """Неизвестный раздел и шард за пределами отдают 404."""
+        for section, shard in (('unknown', 0), ('posts', 100)):
+            with self.subTest(section=section, shard=shard):
+                response = self.guest_client.get(
+                    reverse('posts:sitemap_shard', args=(section, shard))
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -1,9 +1,12 @@
+import shutil
+import tempfile
+import time
 from math import ceil
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
 
@@ -12,7 +15,10 @@ from posts.forms import PostForm
 
 User = get_user_model()
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class URLTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -52,6 +58,11 @@ class URLTests(TestCase):
             user=cls.user_follower
         )
 
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
     def setUp(self):
         self.guest_client = Client()
         self.authorized_client = Client()
@@ -195,6 +206,149 @@ class URLTests(TestCase):
         first_object = response.context['page_obj']
         self.assertNotIn(self.post, first_object)
 
+    def test_follow_status(self):
+        """Статус подписки на несколько авторов отдаётся одним запросом."""
+        self.authorized_client.force_login(self.user_follower)
+        url = reverse('posts:follow_status')
+        with self.assertNumQueries(2):
+            response = self.authorized_client.get(
+                url, {'authors': f'{self.user.pk},{self.user_follower.pk}'}
+            )
+        self.assertEqual(response.json()['following'], {
+            str(self.user.pk): True,
+            str(self.user_follower.pk): False,
+        })
+        response = self.authorized_client.get(url, {'authors': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_feeds_mark_following(self):
+        """Посты в лентах показывают подписчику ссылку «отписаться»."""
+        self.authorized_client.force_login(self.user_follower)
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:follow_index'),
+        ]
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, reverse(
+                    'posts:profile_unfollow', args=(self.user.username,)
+                ))
+
+    def test_cached_index_skips_posts_query(self):
+        """При попадании в кеш фрагмента остаётся только подсчёт постов."""
+        cache.clear()
+        client = Client()
+        client.get(reverse('posts:index'))
+        with self.assertNumQueries(1):
+            client.get(reverse('posts:index'))
+
+
+class NewPostsViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='poller')
+        cls.author = User.objects.create_user(username='poll_author')
+        cls.post = Post.objects.create(author=cls.user, text='Старый пост')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.url = reverse('posts:new_posts')
+
+    def test_no_new_posts_without_queries(self):
+        """Без новых постов ответ берётся из кеша."""
+        self.guest_client.get(self.url, {'since': self.post.pk})
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                self.url, {'since': self.post.pk}
+            )
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_new_posts_counted(self):
+        """Новые посты считаются и для подписок фильтруются по авторам."""
+        own = Post.objects.create(author=self.user, text='Свой пост')
+        followed = Post.objects.create(author=self.author, text='Чужой пост')
+        response = self.guest_client.get(self.url, {'since': self.post.pk})
+        self.assertEqual(response.json()['ids'], [followed.pk, own.pk])
+        self.assertEqual(response.json()['cursor'], followed.pk)
+        response = self.authorized_client.get(
+            self.url, {'since': self.post.pk, 'feed': 'follow'}
+        )
+        self.assertEqual(response.json()['ids'], [followed.pk])
+
+    def test_wait_validated(self):
+        """Бесконечное ожидание отклоняется, отрицательное — обнуляется."""
+        for wait in ('nan', 'inf', '-inf'):
+            with self.subTest(wait=wait):
+                response = self.guest_client.get(self.url, {'wait': wait})
+                self.assertEqual(response.status_code, 400)
+        start = time.monotonic()
+        response = self.guest_client.get(
+            self.url, {'since': self.post.pk, 'wait': '-5'}
+        )
+        self.assertEqual(response.json()['count'], 0)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_follow_feed_requires_login(self):
+        """Лента подписок недоступна анониму."""
+        response = self.guest_client.get(self.url, {'feed': 'follow'})
+        self.assertEqual(response.status_code, 403)
+
+
+class FragmentViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.POSTS_COUNT: int = settings.COUNT + 3
+        cls.user = User.objects.create_user(username='scroller')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_fragments',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([
+            Post(text=f'Пост {i}', group=cls.group, author=cls.user)
+            for i in range(cls.POSTS_COUNT)
+        ])
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_fragments_follow_cursor(self):
+        """Фрагменты отдают только посты и курсор следующей порции."""
+        urls = [
+            reverse('posts:index_fragment'),
+            reverse('posts:group_fragment', args=(self.group.slug,)),
+            reverse('posts:profile_fragment', args=(self.user.username,)),
+            reverse('posts:follow_fragment'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.authorized_client.get(url)
+                self.assertTemplateNotUsed(first, 'base.html')
+                self.assertEqual(len(first.context['posts']), settings.COUNT)
+                cursor = first['X-Next-Cursor']
+                second = self.authorized_client.get(
+                    url, {'cursor': cursor}
+                )
+                self.assertEqual(
+                    len(second.context['posts']),
+                    self.POSTS_COUNT - settings.COUNT
+                )
+                self.assertEqual(second['X-Next-Cursor'], '')
+                self.assertTrue(all(
+                    post.pk < int(cursor) for post in second.context['posts']
+                ))
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
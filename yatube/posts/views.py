@@ -1,10 +1,20 @@
+import math
+import time
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db.models import Max
+from django.http import HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.cache import get_stamps, stamps_etag
+
+from .cache import (cached_groups, cached_posts, cached_users, follow_set,
+                    index_stamp, is_following)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Follow, GroupStats, Post
 
 
 def get_paginator(post_list, page_number):
@@ -12,30 +22,57 @@ def get_paginator(post_list, page_number):
     return paginator.get_page(page_number)
 
 
+def followed_posts(user):
+    """Посты авторов из набора подписок; очень длинный набор не влезает
+    в параметры запроса, и тогда остаётся соединение с Follow."""
+    followed = follow_set(user)
+    if len(followed) > settings.FOLLOW_SET_IN_LIMIT:
+        return Post.objects.filter(author__following__user=user)
+    return Post.objects.filter(author_id__in=list(followed))
+
+
 def index(request):
     post_list = Post.objects.select_related('author', 'group')
+    page_obj = get_paginator(post_list, request.GET.get('page'))
     context = {
-        'page_obj': get_paginator(post_list, request.GET.get('page')),
+        'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = get_object_or_404(cached_groups, slug=slug)
     post_list = group.posts.select_related('author')
+    page_obj = get_paginator(post_list, request.GET.get('page'))
     context = {
-        'page_obj': get_paginator(post_list, request.GET.get('page')),
+        'page_obj': page_obj,
         'group': group,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+def group_index(request):
+    """Каталог групп по дате последнего поста из GroupStats."""
+    page_obj = get_paginator(
+        GroupStats.objects.select_related('group'), request.GET.get('page')
+    )
+    posts = cached_posts.in_bulk(
+        {pk for stats in page_obj for pk in stats.latest_ids}
+    )
+    for stats in page_obj:
+        stats.latest_posts = [
+            posts[pk] for pk in stats.latest_ids if pk in posts
+        ]
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/group_index.html', context)
+
+
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(cached_users, username=username)
     post_list = author.posts.select_related('group')
-    following = (request.user.is_authenticated
-                 and request.user.follower.filter(author=author).exists()
-                 )
+    following = is_following(follow_set(request.user), author.pk)
     context = {
         'author': author,
         'page_obj': get_paginator(post_list, request.GET.get('page')),
@@ -45,11 +82,13 @@ def profile(request, username):
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(
-        Post.objects.select_related('group', 'author'),
-        id=post_id
+    post = get_object_or_404(cached_posts, pk=post_id)
+    comments = list(post.comments.all())
+    authors = cached_users.in_bulk(
+        {comment.author_id for comment in comments}
     )
-    comments = post.comments.select_related('author')
+    for comment in comments:
+        comment.author = authors[comment.author_id]
     context = {
         'post': post,
         'author_posts': post.author.posts.count(),
@@ -59,6 +98,73 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def render_fragment(request, post_list, **flags):
+    """Отдаёт только HTML постов после ?cursor=<id поста>.
+
+    Курсор следующей порции передаётся в заголовке X-Next-Cursor,
+    пустой заголовок означает конец ленты.
+    """
+    try:
+        cursor = int(request.GET.get('cursor', 0))
+    except ValueError:
+        return HttpResponseBadRequest('Неверный курсор')
+    if cursor:
+        post_list = post_list.filter(pk__lt=cursor)
+    posts = list(post_list.order_by('-pk')[:settings.COUNT + 1])
+    next_cursor = ''
+    if len(posts) > settings.COUNT:
+        posts = posts[:settings.COUNT]
+        next_cursor = posts[-1].pk
+    context = {
+        'posts': posts,
+        **flags,
+    }
+    response = render(request, 'posts/includes/post_list.html', context)
+    response['X-Next-Cursor'] = next_cursor
+    return response
+
+
+def index_fragment(request):
+    return render_fragment(
+        request,
+        Post.objects.select_related('author', 'group'),
+        index_link=True,
+        group_list_link=True,
+        follow_link=True,
+    )
+
+
+def group_fragment(request, slug):
+    group = get_object_or_404(cached_groups, slug=slug)
+    return render_fragment(
+        request,
+        group.posts.select_related('author'),
+        index_link=True,
+        follow_link=True,
+    )
+
+
+def profile_fragment(request, username):
+    author = get_object_or_404(cached_users, username=username)
+    return render_fragment(
+        request,
+        author.posts.select_related('author', 'group'),
+        group_list_link=True,
+    )
+
+
+@login_required
+def follow_fragment(request):
+    return render_fragment(
+        request,
+        followed_posts(request.user).select_related('author', 'group'),
+        group_list_link=True,
+        detail_link=True,
+        follow_link=True,
+        follow=True,
+    )
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None)
@@ -75,10 +181,7 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(
-        Post.objects.select_related('group', 'author'),
-        id=post_id
-    )
+    post = get_object_or_404(cached_posts, pk=post_id)
     if post.author != request.user:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
@@ -98,7 +201,7 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(cached_posts, pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -110,11 +213,10 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.select_related('author', 'group').filter(
-        author__following__user=request.user
-    )
+    posts = followed_posts(request.user).select_related('author', 'group')
+    page_obj = get_paginator(posts, request.GET.get('page'))
     context = {
-        'page_obj': get_paginator(posts, request.GET.get('page')),
+        'page_obj': page_obj,
         'follow': True,
     }
     return render(request, 'posts/follow.html', context)
@@ -122,7 +224,7 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(cached_users, username=username)
     if author != request.user:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username=username)
@@ -134,3 +236,84 @@ def profile_unfollow(request, username):
         user=request.user, author__username=username
     ).delete()
     return redirect('posts:profile', username=username)
+
+
+def follow_status(request):
+    """Статус подписки на авторов из ?authors=1,2,3 одним запросом."""
+    try:
+        author_ids = {
+            int(author_id)
+            for author_id in request.GET.get('authors', '').split(',')
+            if author_id
+        }
+    except ValueError:
+        return JsonResponse({'error': 'Неверный список авторов'}, status=400)
+    if len(author_ids) > settings.FOLLOW_STATUS_LIMIT:
+        return JsonResponse({'error': 'Слишком много авторов'}, status=400)
+    followed = follow_set(request.user)
+    return JsonResponse({
+        'following': {
+            str(author_id): is_following(followed, author_id)
+            for author_id in sorted(author_ids)
+        },
+    })
+
+
+def newest_post_id():
+    """Наибольший id поста, закешированный до следующей записи поста."""
+    key = f'posts:newest:{stamps_etag(get_stamps(index_stamp()))}'
+    return cache.get_or_set(
+        key,
+        lambda: Post.objects.aggregate(newest=Max('pk'))['newest'] or 0,
+        settings.FEED_CACHE_TIME,
+    )
+
+
+def new_posts_params(params):
+    """since и wait из запроса; wait ограничен [0, NEW_POSTS_MAX_WAIT]."""
+    since = int(params.get('since', 0))
+    wait = float(params.get('wait', 0))
+    if not math.isfinite(wait):
+        raise ValueError('wait должен быть конечным числом')
+    return since, min(max(wait, 0), settings.NEW_POSTS_MAX_WAIT)
+
+
+def new_posts(request):
+    """Количество и id постов новее ?since=<id поста>.
+
+    С ?wait=<секунды> ждёт появления новых постов не дольше
+    NEW_POSTS_MAX_WAIT, опрашивая только кеш. ?feed=follow ограничивает
+    ответ подписками пользователя.
+    """
+    try:
+        since, wait = new_posts_params(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'Неверные параметры'}, status=400)
+    posts = Post.objects.filter(pk__gt=since)
+    if request.GET.get('feed') == 'follow':
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Нужна авторизация'}, status=403)
+        posts = posts & followed_posts(request.user)
+    deadline = time.monotonic() + wait
+    checked = since
+    ids = []
+    while True:
+        newest = newest_post_id()
+        if newest > checked:
+            ids = list(posts.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:settings.NEW_POSTS_LIMIT])
+            if ids:
+                break
+            checked = newest
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(settings.NEW_POSTS_POLL_INTERVAL)
+    count = len(ids)
+    if count == settings.NEW_POSTS_LIMIT:
+        count = posts.count()
+    return JsonResponse({
+        'count': count,
+        'ids': ids,
+        'cursor': ids[0] if ids else since,
+    })
@@ -50,20 +50,26 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowQueryMiddleware',
+    'core.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.IdentityMapMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.TemplateProfilerMiddleware',
+    'core.middleware.MemoryProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -135,6 +141,16 @@ COUNT: int = 10
 POST_OF_PAGE: int = 8
 ZERO_POST: int = 0
 CACHE_TIME: int = 20
+FEED_COUNT: int = 20
+FEED_TITLE_LENGTH: int = 50
+FEED_CACHE_TIME: int = 60 * 60
+SITEMAP_SHARD_SIZE: int = 50000
+SITEMAP_CHUNK_SIZE: int = 1000
+SITEMAP_CACHE_TIME: int = 60 * 60 * 6
+FOLLOW_STATUS_LIMIT: int = 100
+NEW_POSTS_LIMIT: int = 100
+NEW_POSTS_MAX_WAIT: int = 25
+NEW_POSTS_POLL_INTERVAL: float = 0.5
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -148,8 +164,93 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Общий уровень кеша хранит pickle, поэтому каталог принадлежит проекту,
+# а не лежит в общем для всех /tmp. Тесты подменяют его временным
+# каталогом (core.testing).
+CACHE_DIR = os.environ.get(
+    'YATUBE_CACHE_DIR', os.path.join(BASE_DIR, '.cache')
+)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.InstrumentedCache',
+        'OPTIONS': {'TARGET': 'tiered'},
+    },
+    'tiered': {
+        'BACKEND': 'core.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,
+            'CHECK_INTERVAL': 1,
+            'SHARED_ONLY': (
+                'stamp:', 'lock:', 'follows:',
+                'django.contrib.sessions.cached_db',
+            ),
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.SharedFileCache',
+        'LOCATION': CACHE_DIR,
+        'KEY_FUNCTION': 'core.cache.database_key',
+        'OPTIONS': {'MAX_ENTRIES': 10000, 'CULL_INTERVAL': 60},
+    },
+}
+
+# Сессия читается из кеша, в базу идут только записи и промахи.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CLEANUP_BATCH_SIZE: int = 1000
+
+CACHE_GRACE_TIME: int = 60
+CACHE_LOCK_TIMEOUT: int = 10
+CACHE_LOCK_WAIT: float = 2
+CACHE_EARLY_REFRESH_BETA: float = 1.0
+OBJECT_CACHE_TIME: int = 60 * 60
+FOLLOW_SET_CACHE_TIME: int = 60 * 60 * 24
+FOLLOW_SET_IN_LIMIT: int = 500
+POST_CARD_CACHE_TIME: int = 60 * 60 * 24
+CACHE_WARMUP_PAGES: int = 3
+CACHE_WARMUP_GROUPS: int = 10
+CACHE_WARMUP_PROFILES: int = 10
+CACHE_WARMUP_CONCURRENCY: int = 4
+
+TEST_RUNNER = 'core.testing.TestRunner'
+
+SERVER_TIMING_SAMPLE_RATE: float = 1.0
+SERVER_TIMING_HEADER: bool = True
+N_PLUS_ONE_THRESHOLD: int = 5
+TEMPLATE_PROFILING: bool = False
+SLOW_QUERY_THRESHOLD_MS: float = 100
+# Как и CACHE_DIR, принадлежит проекту, а не общему /tmp.
+METRICS_DIR = os.environ.get(
+    'YATUBE_METRICS_DIR', os.path.join(BASE_DIR, '.metrics')
+)
+METRICS_FLUSH_INTERVAL: float = 5
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+MEMORY_PROFILING: bool = False
+MEMORY_PROFILE_VIEWS = ('posts:index', 'posts:profile', 'posts:follow_index')
+MEMORY_TRACE_FRAMES: int = 10
+MEMORY_REPORT_LIMIT: int = 20
+
+THUMBNAIL_BACKEND = 'core.thumbnails.TimedThumbnailBackend'
+THUMBNAIL_KVSTORE = 'core.thumbnails.KVStore'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'yatube': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+        'yatube.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
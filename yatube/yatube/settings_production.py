@@ -0,0 +1,32 @@
+"""
+Production settings for yatube project.
+
+Run with ``DJANGO_SETTINGS_MODULE=yatube.settings_production``.
+
+With ``DEBUG = True`` Django reads and parses every template on each
+render, so here the cached template loader is enabled explicitly: a
+template is compiled once per process. ``python manage.py
+compile_templates`` checks at build time that all project templates
+compile, and ``yatube.wsgi`` compiles them before serving requests.
+"""
+
+import copy
+
+from .settings import *  # noqa: F401,F403
+from .settings import TEMPLATES
+
+DEBUG = False
+
+# Замеряется каждый сотый запрос; тайминги базы и кеша уходят только в
+# лог yatube.timing, а не клиентам.
+SERVER_TIMING_SAMPLE_RATE = 0.01
+SERVER_TIMING_HEADER = False
+
+TEMPLATES = copy.deepcopy(TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
@@ -5,6 +5,13 @@ It exposes the WSGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
+
+Before the callable is returned the URL resolver, project templates and
+the thumbnail engine are warmed up, so that with a preloading server
+(``gunicorn --preload``) the work is done once before forking workers.
+Set ``YATUBE_WARMUP=0`` to skip it. With ``yatube.settings_production``
+the cached template loader keeps the compiled templates for the life of
+the process.
 """
 
 import os
@@ -14,3 +21,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if os.environ.get('YATUBE_WARMUP', '1') != '0':
+    from core.warmup import warm_up
+
+    warm_up()